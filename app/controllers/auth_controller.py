@@ -10,16 +10,20 @@ from ..models.user import (
     UserBan,
 )
 from ..utils.security import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
+    password_needs_rehash,
     create_access_token,
     create_refresh_token,
     decode_token,
     decode_token_noexp,
     is_refresh,
+    refresh_token_fingerprint,
     totp_generate_secret,
     totp_verify,
 )
+from ..services.bans import get_ban_index
+from ..utils.executor import run_blocking
 import app.utils.encryption as enc
 from jose import JWTError
 
@@ -27,6 +31,9 @@ from jose import JWTError
 class AuthController:
     def _active_ban(self, db: Session, user_id: str) -> Optional[UserBan]:
         """Retourne le ban actif le plus récent s'il existe, sinon None."""
+        # Cas courant: pas de ban connu, pas de requête
+        if not get_ban_index().is_banned(user_id):
+            return None
         now = datetime.utcnow()
         ban = (
             db.query(UserBan)
@@ -40,11 +47,51 @@ class AuthController:
         )
         return ban
 
-    def register(self, db: Session, username: str, email: str, password: str) -> User:
+    def _find_session(
+        self, db: Session, user_id: str, refresh_token: str
+    ) -> Optional[UserSession]:
+        """Retrouve la session d'un refresh token via son empreinte (index unique)."""
+        fp = refresh_token_fingerprint(refresh_token)
+        sess = db.query(UserSession).filter(UserSession.refresh_token_fp == fp).first()
+        if sess:
+            return sess if sess.user_id == user_id else None
+        # Compat: sessions pas encore rétro-remplies -> comparaison par déchiffrement
+        legacy = (
+            db.query(UserSession)
+            .filter(
+                UserSession.user_id == user_id,
+                UserSession.refresh_token_fp.is_(None),
+            )
+            .all()
+        )
+        for s in legacy:
+            try:
+                plain = enc.decrypt_str(s.refresh_token) if s.refresh_token else None
+                if plain == refresh_token:
+                    return s
+            except Exception:
+                continue
+        return None
+
+    async def register(
+        self, db: Session, username: str, email: str, password: str
+    ) -> User:
+        # Argon2 attendu sans thread; accès DB dans le pool dédié
+        if await run_blocking(self._email_taken, db, email):
+            raise ValueError("email_taken")
+        password_hash = await hash_password_async(password)
+        return await run_blocking(self._create_user, db, username, email, password_hash)
+
+    def _email_taken(self, db: Session, email: str) -> bool:
+        return db.query(User.id).filter(User.email == email).first() is not None
+
+    def _create_user(
+        self, db: Session, username: str, email: str, password_hash: str
+    ) -> User:
         # Unicité sur l'email uniquement; usernames peuvent être dupliqués
-        if db.query(User).filter(User.email == email).first():
+        if self._email_taken(db, email):
             raise ValueError("email_taken")
-        u = User(username=username, email=email, password_hash=hash_password(password))
+        u = User(username=username, email=email, password_hash=password_hash)
         db.add(u)
         db.commit()
         db.refresh(u)
@@ -59,6 +106,7 @@ class AuthController:
         sess = UserSession(
             user_id=user.id,
             refresh_token=enc.encrypt_str(refresh) or refresh,
+            refresh_token_fp=refresh_token_fingerprint(refresh),
             created_at=datetime.utcnow(),
             expires_at=datetime.utcnow() + timedelta(days=30),
         )
@@ -66,18 +114,36 @@ class AuthController:
         db.commit()
         return access, refresh
 
-    def login_step1(
+    async def login_step1(
         self, db: Session, username_or_email: str, password: str
     ) -> tuple[User, Optional[str]]:
-        q = (
+        q = await run_blocking(self._find_login_user, db, username_or_email)
+        if not q or not await verify_password_async(password, q.password_hash):
+            raise ValueError("invalid_credentials")
+        # Paramètres Argon2 modifiés: mettre le hash à niveau de façon transparente
+        new_hash = None
+        if password_needs_rehash(q.password_hash):
+            new_hash = await hash_password_async(password)
+        return await run_blocking(self._finish_login_step1, db, q, new_hash)
+
+    def _find_login_user(self, db: Session, username_or_email: str) -> Optional[User]:
+        return (
             db.query(User)
             .filter(
                 (User.username == username_or_email) | (User.email == username_or_email)
             )
             .first()
         )
-        if not q or not verify_password(password, q.password_hash):
-            raise ValueError("invalid_credentials")
+
+    def _finish_login_step1(
+        self, db: Session, q: User, new_hash: Optional[str]
+    ) -> tuple[User, Optional[str]]:
+        if new_hash:
+            # Mot de passe vérifié: mettre le hash à niveau avant tout refus
+            # (ban, 2FA), sinon les anciens paramètres Argon2 persisteraient
+            q.password_hash = new_hash
+            db.add(q)
+            db.commit()
         # Interdire si banni
         if self._active_ban(db, q.id):
             raise ValueError("user_banned")
@@ -145,24 +211,10 @@ class AuthController:
                 payload = decode_token_noexp(refresh_token)
                 user_id = payload.get("sub") if isinstance(payload, dict) else None
                 if user_id:
-                    sessions = (
-                        db.query(UserSession)
-                        .filter(UserSession.user_id == user_id)
-                        .all()
-                    )
-                    for s in sessions:
-                        try:
-                            plain = (
-                                enc.decrypt_str(s.refresh_token)
-                                if s.refresh_token
-                                else None
-                            )
-                            if plain == refresh_token:
-                                db.delete(s)
-                                db.commit()
-                                break
-                        except Exception:
-                            continue
+                    expired = self._find_session(db, user_id, refresh_token)
+                    if expired:
+                        db.delete(expired)
+                        db.commit()
                 # signale au client que le refresh a expiré
                 raise ValueError("token_expired")
             except JWTError:
@@ -170,20 +222,11 @@ class AuthController:
                 raise ValueError("invalid_token")
         if not is_refresh(payload):
             raise ValueError("not_refresh_token")
-        # Validate session exists: on cible l'utilisateur via le JWT, puis on compare par déchiffrement
+        # Validate session exists: lookup indexé par empreinte du refresh token
         user_id = payload.get("sub")
         if not user_id:
             raise ValueError("invalid_token_subject")
-        sessions = db.query(UserSession).filter(UserSession.user_id == user_id).all()
-        sess = None
-        for s in sessions:
-            try:
-                plain = enc.decrypt_str(s.refresh_token) if s.refresh_token else None
-                if plain == refresh_token:
-                    sess = s
-                    break
-            except Exception:
-                continue
+        sess = self._find_session(db, user_id, refresh_token)
         if not sess:
             raise ValueError("session_revoked")
         user = db.query(User).filter(User.id == sess.user_id).first()
@@ -209,20 +252,10 @@ class AuthController:
             user_id = payload.get("sub") if isinstance(payload, dict) else None
             if not user_id:
                 return
-            sessions = (
-                db.query(UserSession).filter(UserSession.user_id == user_id).all()
-            )
-            for s in sessions:
-                try:
-                    plain = (
-                        enc.decrypt_str(s.refresh_token) if s.refresh_token else None
-                    )
-                    if plain == refresh_token:
-                        db.delete(s)
-                        db.commit()
-                        break
-                except Exception:
-                    continue
+            sess = self._find_session(db, user_id, refresh_token)
+            if sess:
+                db.delete(sess)
+                db.commit()
         except Exception:
             # ignorer silencieusement: on a tout de même vidé les cookies côté routeur
             return
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import os
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from .routes import (
     public,
     auth,
@@ -15,8 +16,12 @@ from .routes import (
     realtime,
 )
 from .services.state import get_state
+from .services.realtime import get_manager
 from .services.cleanup import cleanup_scheduler
+from .services.http_client import close_http_clients
 from .utils.database import create_all
+from .utils.executor import shutdown_blocking_executor, shutdown_color_process_pool
+from .utils.security import PasswordHasherBusy
 
 
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -45,6 +50,16 @@ if os.getenv("ENABLE_CORS", "false").lower() == "true":
         allow_headers=["*"],
     )
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    # Pool Argon2 saturé: échouer vite plutôt que d'empiler les requêtes
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serveur occupé, réessayez dans un instant"},
+        headers={"Retry-After": "1"},
+    )
+
+
 state = get_state()
 _cleanup_stop_event = None
 _cleanup_task = None
@@ -76,6 +91,7 @@ async def on_startup():
     except Exception:
         pass
     await state.start()
+    await get_manager().start()
     # Démarrer la tâche de nettoyage en arrière-plan
     import asyncio
 
@@ -87,6 +103,7 @@ async def on_startup():
 @app.on_event("shutdown")
 async def on_shutdown():
     await state.stop()
+    await get_manager().stop()
     # Arrêter le scheduler
     try:
         if _cleanup_stop_event is not None:
@@ -95,6 +112,9 @@ async def on_shutdown():
             await _cleanup_task
     except Exception:
         pass
+    await close_http_clients()
+    shutdown_blocking_executor()
+    shutdown_color_process_pool()
 
 
 # Simple health
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import String, DateTime, ForeignKey, Text, Integer
 from ..utils.database import Base
 from ..utils.shortid import new_short_uuid
 
@@ -90,6 +90,10 @@ class UserSession(Base):
     )
     # Stockage unique du refresh token (chiffré au repos)
     refresh_token: Mapped[str] = mapped_column(String(2048), unique=True)
+    # Empreinte HMAC du refresh token (lookup indexé, cf. refresh_token_fingerprint)
+    refresh_token_fp: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, unique=True, index=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     expires_at: Mapped[datetime] = mapped_column(DateTime)
 
@@ -233,3 +237,20 @@ class UserBan(Base):
         "User", foreign_keys=[user_id], back_populates="bans"
     )
     moderator: Mapped[User] = relationship("User", foreign_keys=[moderator_id])
+
+
+class TrackColor(Base):
+    __tablename__ = "api_track_colors"
+
+    # Empreinte SHA-256 de l'URL de pochette (clé courte et indexable)
+    image_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    image_url: Mapped[str] = mapped_column(String(512))
+    track_id: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, index=True
+    )
+    r: Mapped[int] = mapped_column(Integer)
+    g: Mapped[int] = mapped_column(Integer)
+    b: Mapped[int] = mapped_column(Integer)
+    # Version de l'algorithme d'extraction: une ligne d'une autre version est ignorée
+    algo_version: Mapped[int] = mapped_column(Integer, default=1)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -12,6 +12,13 @@ from ..schemas.admin import (
     UserWarningsOut,
     WarningItem,
 )
+from ..services.state import get_state
+from ..services.bans import get_ban_index
+from ..services.color_cache import get_color_cache, get_thumbnail_cache
+from ..services.track_color_store import get_track_color_store
+from ..services.spotify_rate_limiter import get_rate_limiter
+from ..services.realtime import get_manager
+from ..utils.security import password_pool_stats, token_cache_stats
 
 router = APIRouter()
 
@@ -43,6 +50,26 @@ def admin_stats(_: User = Depends(require_admin), db: Session = Depends(get_db))
     )
 
 
+@router.get("/runtime")
+def admin_runtime(_: User = Depends(require_admin)):
+    """Métriques runtime de ce processus (extracteurs, planificateur Spotify)."""
+    state = get_state()
+    return {
+        "extractors": state.get_stats(),
+        "user_config_cache": state.get_config_stats(),
+        "poller": state.poller.get_stats(),
+        "demand": state.get_demand_stats(),
+        "spotify_rate_limit": get_rate_limiter().get_stats(),
+        "realtime": get_manager().get_stats(),
+        "password_hashing": password_pool_stats(),
+        "bans": get_ban_index().get_stats(),
+        "jwt_cache": token_cache_stats(),
+        "album_color_cache": get_color_cache().get_stats(),
+        "thumbnail_cache": get_thumbnail_cache().get_stats(),
+        "track_colors": get_track_color_store().get_stats(),
+    }
+
+
 @router.get("/users", response_model=UserListOut)
 def admin_list_users(
     _: User = Depends(require_admin),
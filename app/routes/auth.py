@@ -17,7 +17,8 @@ from ..schemas.auth import (
     TwoFADisableConfirmIn,
 )
 from ..schemas.user import TwoFASetupOut, TwoFAVerifyIn, UserOut
-from ..utils.security import decode_token
+from ..utils.security import decode_token, hash_password_async
+from ..utils.executor import run_blocking
 from ..utils.auth_dep import get_current_user_id
 from ..models.user import User, PasswordReset
 from ..utils.mailer import (
@@ -31,17 +32,25 @@ router = APIRouter()
 ctrl = AuthController()
 
 
+def _login_after_register(db: Session, u: User) -> tuple[str, str]:
+    # Considéré comme connecté après inscription: maj last_login_at
+    u.last_login_at = datetime.utcnow()
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    # Émettre directement les tokens comme pour un login sans 2FA
+    return ctrl._issue_tokens(db, u)
+
+
+# Routes à mot de passe en async: l'attente d'Argon2 n'occupe aucun thread
+# du threadpool Starlette (les autres routes sync restent servies)
 @router.post("/register", response_model=LoginTokensOut)
-def register(payload: RegisterIn, resp: Response, db: Session = Depends(get_db)):
+async def register(
+    payload: RegisterIn, resp: Response, db: Session = Depends(get_db)
+):
     try:
-        u = ctrl.register(db, payload.username, payload.email, payload.password)
-        # Considéré comme connecté après inscription: maj last_login_at
-        u.last_login_at = datetime.utcnow()
-        db.add(u)
-        db.commit()
-        db.refresh(u)
-        # Émettre directement les tokens comme pour un login sans 2FA
-        access, refresh = ctrl._issue_tokens(db, u)
+        u = await ctrl.register(db, payload.username, payload.email, payload.password)
+        access, refresh = await run_blocking(_login_after_register, db, u)
         # Set HttpOnly cookies
         set_access_cookie(resp, access)
         set_refresh_cookie(resp, refresh)
@@ -61,17 +70,19 @@ def register(payload: RegisterIn, resp: Response, db: Session = Depends(get_db))
 
 
 @router.post("/login", response_model=LoginTokensOut | LoginStep1Out)
-def login_step1(payload: LoginIn, resp: Response, db: Session = Depends(get_db)):
+async def login_step1(
+    payload: LoginIn, resp: Response, db: Session = Depends(get_db)
+):
     try:
-        u, ticket = ctrl.login_step1(db, payload.username_or_email, payload.password)
+        u, ticket = await ctrl.login_step1(
+            db, payload.username_or_email, payload.password
+        )
         if ticket:
             return {"requires_2fa": True, "ticket": ticket}
         # Pas de 2FA: on émet les tokens directement
-        from ..controllers.auth_controller import AuthController
-
         # Rôle: default "user" (pas de champ role en DB pour l'instant)
         role = "user"
-        access, refresh = AuthController()._issue_tokens(db, u)
+        access, refresh = await run_blocking(ctrl._issue_tokens, db, u)
         set_access_cookie(resp, access)
         set_refresh_cookie(resp, refresh)
         return LoginTokensOut(
@@ -232,9 +243,8 @@ def forgot_password(body: ForgotPwdIn, db: Session = Depends(get_db)):
     return {"status": "sent", "email_sent": bool(sent)}
 
 
-@router.post("/reset")
-def reset_password(body: ResetPwdIn, db: Session = Depends(get_db)):
-    token_hash = hashlib.sha256(body.token.encode("utf-8")).hexdigest()
+def _load_password_reset(db: Session, token: str) -> tuple[PasswordReset, User]:
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
     pr = db.query(PasswordReset).filter(PasswordReset.token == token_hash).first()
     if not pr:
         raise HTTPException(status_code=400, detail="Token invalide ou expiré")
@@ -249,10 +259,14 @@ def reset_password(body: ResetPwdIn, db: Session = Depends(get_db)):
     u = db.query(User).filter(User.id == pr.user_id).first()
     if not u:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-    from ..utils.security import hash_password
+    return pr, u
+
 
+def _apply_password_reset(
+    db: Session, pr: PasswordReset, u: User, password_hash: str
+) -> None:
     # Mettre à jour le mot de passe
-    u.password_hash = hash_password(body.new_password)
+    u.password_hash = password_hash
 
     # Désactiver la 2FA si elle est activée (sécurité : l'utilisateur a peut-être perdu son dispositif)
     if u.twofa:
@@ -265,6 +279,13 @@ def reset_password(body: ResetPwdIn, db: Session = Depends(get_db)):
     db.add(u)
     db.delete(pr)
     db.commit()
+
+
+@router.post("/reset")
+async def reset_password(body: ResetPwdIn, db: Session = Depends(get_db)):
+    pr, u = await run_blocking(_load_password_reset, db, body.token)
+    password_hash = await hash_password_async(body.new_password)
+    await run_blocking(_apply_password_reset, db, pr, u, password_hash)
     return {"status": "ok"}
 
 
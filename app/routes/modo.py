@@ -14,6 +14,7 @@ from ..schemas.admin import (
 )
 from ..schemas.overlay import OverlayUpdateIn, OverlayOut, OverlayModerationOut
 from ..services.realtime import get_manager
+from ..services.bans import get_ban_index
 
 router = APIRouter()
 
@@ -200,6 +201,7 @@ def ban_user(
     # Révoquer toutes les sessions (refresh tokens) de l'utilisateur pour forcer la déconnexion
     revoked = db.query(UserSession).filter(UserSession.user_id == u.id).delete()
     db.commit()
+    get_ban_index().refresh_user(db, u.id)
     # Notifier en temps réel (si connecté via /ws): force logout immédiat
     try:
         manager = get_manager()
@@ -231,6 +233,7 @@ def revoke_ban(
     ban.revoked_at = datetime.utcnow()
     db.add(ban)
     db.commit()
+    get_ban_index().refresh_user(db, user_id)
     return {"status": "ok", "revoked_at": ban.revoked_at}
 
 
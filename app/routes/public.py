@@ -3,54 +3,71 @@ import time
 from sqlalchemy.orm import Session
 from ..services.state import get_state
 from ..utils.database import get_db
+from ..utils.executor import run_blocking
 from ..models.user import Overlay
 from ..schemas.overlay import OverlayOut
 
 router = APIRouter()
 
 
-@router.get("/infos/{user_id}", summary="Infos")
-async def infos(user_id: str, db: Session = Depends(get_db)):
-    extractor = get_state().get_extractor_for_user(user_id, db)
-    # Track info (peut être None si non configuré ou rien en lecture)
-    track_info = extractor.get_current_track_info()
-    # Couleur extraite avec mesure de temps
+async def _get_extractor(user_id: str, db: Session):
+    state = get_state()
+    # Config en cache et à jour: aucun accès DB, pas de passage par le pool
+    extractor = state.get_cached_extractor(user_id)
+    if extractor is None:
+        # Requêtes DB/déchiffrement synchrones: hors de la boucle d'événements
+        extractor = await run_blocking(
+            state.get_extractor_for_known_user, user_id, db
+        )
+        if extractor is None:
+            raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+    state.note_viewer(user_id)
+    return extractor
+
+
+def _snapshot_payload(extractor, user_id: str, snapshot) -> dict:
+    """Construit la réponse depuis un snapshot publié par le poller.
+
+    Aucun appel Spotify ni téléchargement ici: lecture en temps constant.
+    Le snapshot est lu une seule fois par l'appelant: couleur, piste et
+    progression viennent du même état.
+    """
     started = time.time()
-    r, g, b = extractor.extract_color()
+    r, g, b = extractor.snapshot_color(snapshot)
     processing_ms = int((time.time() - started) * 1000)
-
-    payload = {
+    return {
         "color": {"r": r, "g": g, "b": b, "hex": f"#{r:02x}{g:02x}{b:02x}"},
         "processing_time_ms": processing_ms,
         "source": "album",
         "status": "success",
         "timestamp": int(time.time()),
         "user": user_id,
+        # Fraîcheur des données (None tant qu'aucun poll n'a abouti)
+        "fetched_at": int(snapshot.fetched_at) if snapshot else None,
+        "age_ms": snapshot.age_ms() if snapshot else None,
     }
 
+
+@router.get("/infos/{user_id}", summary="Infos")
+async def infos(user_id: str, db: Session = Depends(get_db)):
+    extractor = await _get_extractor(user_id, db)
+    snapshot = extractor.get_snapshot()
+    payload = _snapshot_payload(extractor, user_id, snapshot)
+    # Track info (peut être None si non configuré ou rien en lecture)
+    track_info = snapshot.track if snapshot else None
     if track_info is None:
         payload["track"] = {"id": None, "name": "No music playing", "is_playing": False}
     else:
-        payload["track"] = track_info
+        payload["track"] = dict(track_info)
 
     return payload
 
 
 @router.get("/color/{user_id}", summary="Color")
 async def color(user_id: str, db: Session = Depends(get_db)):
-    extractor = get_state().get_extractor_for_user(user_id, db)
+    extractor = await _get_extractor(user_id, db)
     try:
-        started = time.time()
-        r, g, b = extractor.extract_color()
-        processing_ms = int((time.time() - started) * 1000)
-        return {
-            "color": {"r": r, "g": g, "b": b, "hex": f"#{r:02x}{g:02x}{b:02x}"},
-            "processing_time_ms": processing_ms,
-            "source": "album",
-            "status": "success",
-            "timestamp": int(time.time()),
-            "user": user_id,
-        }
+        return _snapshot_payload(extractor, user_id, extractor.get_snapshot())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -61,7 +78,9 @@ async def color(user_id: str, db: Session = Depends(get_db)):
 async def get_public_overlay(overlay_id: str, db: Session = Depends(get_db)):
     """Endpoint public (sans auth) pour récupérer un overlay par son ID.
     Ne renvoie pas d'informations sensibles (pas d'owner_id)."""
-    ov = db.query(Overlay).filter(Overlay.id == overlay_id).first()
+    ov = await run_blocking(
+        lambda: db.query(Overlay).filter(Overlay.id == overlay_id).first()
+    )
     if not ov:
         raise HTTPException(status_code=404, detail="Overlay introuvable")
     return ov
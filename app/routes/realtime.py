@@ -1,20 +1,33 @@
 import logging
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from ..utils.database import get_db
+from ..utils.database import SessionLocal
 from ..utils.security import decode_token
-from ..models.user import User
+from ..models.user import User, Overlay
 from ..services.realtime import get_manager
+from ..services.state import get_state
+from ..utils.executor import run_blocking
 
 router = APIRouter()
 
 bearer = HTTPBearer(auto_error=False)
 
 
-async def _auth_user_id(
-    websocket: WebSocket, db: Session = Depends(get_db)
-) -> str | None:
+def _in_session(fn, *args):
+    """Session courte pour les lectures d'ouverture de socket.
+
+    Une session Depends(get_db) resterait ouverte toute la vie de la socket
+    et garderait une connexion du pool par spectateur.
+    """
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+def _auth_user_id(db: Session, websocket: WebSocket) -> str | None:
     # 1) Authorization header (Bearer)
     auth = websocket.headers.get("authorization")
     token = None
@@ -50,17 +63,93 @@ async def _auth_user_id(
 
 
 @router.websocket("/ws")
-async def ws_endpoint(websocket: WebSocket, db: Session = Depends(get_db)):
-    user_id = await _auth_user_id(websocket, db)
+async def ws_endpoint(websocket: WebSocket):
+    user_id = await run_blocking(_in_session, _auth_user_id, websocket)
     if not user_id:
         await websocket.close(code=4401)
         return
     await websocket.accept()
     manager = get_manager()
     await manager.connect(user_id, websocket)
+    # Spectateur connecté: repasser au poll Spotify rapide
+    state = get_state()
+    state.note_viewer(user_id, connected=True)
+    # État courant tout de suite; les changements suivants sont poussés par le
+    # poller de ce worker (chaque worker suit les utilisateurs qu'il sert)
+    extractor = state.get_cached_extractor(user_id)
+    if extractor is None:
+        extractor = await run_blocking(
+            _in_session,
+            lambda db: state.get_extractor_for_user(user_id, db),
+        )
+    # (via la file d'envoi: seule la tâche d'écriture écrit sur la socket)
+    if extractor is not None and extractor.get_snapshot() is not None:
+        manager.send_to_socket(
+            websocket, extractor.build_update_event(user_id, extractor.get_snapshot())
+        )
     try:
         while True:
-            # garder la connexion vivante; ignorer les messages
+            # Contenu ignoré; tout message (pong compris) prouve que le client vit
             await websocket.receive_text()
+            manager.touch(websocket)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(user_id, websocket)
+
+
+async def _serve_public(websocket: WebSocket, user_id: str) -> None:
+    """Canal public en lecture seule: état courant puis changements poussés.
+
+    Tous les spectateurs d'un même utilisateur partagent un seul poll Spotify.
+    """
+    state = get_state()
+    extractor = state.get_cached_extractor(user_id)
+    if extractor is None:
+        # Identifiant inconnu: ne pas créer (ni suivre) d'extracteur pour rien
+        extractor = await run_blocking(
+            _in_session,
+            lambda db: state.get_extractor_for_known_user(user_id, db),
+        )
+        if extractor is None:
+            await websocket.close(code=4404)
+            return
+    await websocket.accept()
+    manager = get_manager()
+    if not manager.subscribe_public(user_id, websocket):
+        # 1013: réessayer plus tard (canal plein)
+        await websocket.close(code=1013, reason="channel full")
+        return
+    try:
+        state.note_viewer(user_id, connected=True)
+        manager.send_to_socket(
+            websocket, extractor.build_update_event(user_id, extractor.get_snapshot())
+        )
+        while True:
+            # Lecture seule: les messages du client ne servent que de heartbeat
+            await websocket.receive_text()
+            manager.touch(websocket)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.unsubscribe_public(user_id, websocket)
+
+
+@router.websocket("/ws/public/{user_id}")
+async def ws_public_user(websocket: WebSocket, user_id: str):
+    await _serve_public(websocket, user_id)
+
+
+@router.websocket("/ws/overlay/{overlay_id}")
+async def ws_public_overlay(websocket: WebSocket, overlay_id: str):
+    owner_id = await run_blocking(
+        _in_session,
+        lambda db: db.query(Overlay.owner_id)
+        .filter(Overlay.id == overlay_id)
+        .scalar(),
+    )
+    if not owner_id:
+        await websocket.close(code=4404)
+        return
+    # Canal du propriétaire: un overlay partage le flux de son utilisateur
+    await _serve_public(websocket, owner_id)
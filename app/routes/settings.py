@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from ..utils.database import get_db
 from ..utils.auth_dep import get_current_user_id
 from ..models.user import UserSetting, User
+from ..services.state import get_state
 
 router = APIRouter()
 
@@ -60,6 +61,8 @@ def update_settings(
     db.add(s)
     db.commit()
     db.refresh(s)
+    # La couleur de secours des overlays doit être relue par /color et /infos
+    get_state().invalidate_user_config(uid)
     color_default = getattr(s, "default_overlay_color", None) or "#25d865"
     return {
         "theme": s.theme,
@@ -7,6 +7,7 @@ from ..models.user import SpotifySecret, SpotifyToken
 import app.utils.encryption as enc
 from ..schemas.spotify import SpotifyCredentialsIn, SpotifyCredentialsStatusOut
 from ..services.state import get_state
+from ..utils.executor import run_blocking
 
 
 router = APIRouter()
@@ -65,6 +66,7 @@ def upsert_spotify_credentials(
     db.add(row)
     db.commit()
     db.refresh(row)
+    get_state().invalidate_user_config(uid)
     tok = db.query(SpotifyToken).filter(SpotifyToken.user_id == uid).first()
     return SpotifyCredentialsStatusOut(
         has_client_id=bool(row.client_id),
@@ -89,8 +91,17 @@ def get_spotify_auth_url(
     return {"url": url}
 
 
+def _save_refresh_token(db: Session, uid: str, rt: str) -> None:
+    tok = db.query(SpotifyToken).filter(SpotifyToken.user_id == uid).first()
+    if not tok:
+        tok = SpotifyToken(user_id=uid)
+    tok.refresh_token = enc.encrypt_str(rt)
+    db.add(tok)
+    db.commit()
+
+
 @router.get("/callback")
-def spotify_oauth_callback(
+async def spotify_oauth_callback(
     code: str | None = None,
     redirect_uri: str | None = None,
     uid: str = Depends(get_current_user_id),
@@ -99,23 +110,20 @@ def spotify_oauth_callback(
     if not code:
         raise HTTPException(status_code=400, detail="Paramètre 'code' manquant")
     state = get_state()
-    extractor = state.get_extractor_for_user(uid, db)
+    extractor = await run_blocking(state.get_extractor_for_user, uid, db)
     if redirect_uri:
         extractor.spotify_client.redirect_uri = redirect_uri
 
-    ok = extractor.exchange_code_for_tokens(code)
+    # Échange du code via le client HTTP async partagé
+    ok = await extractor.exchange_code_for_tokens(code)
     if not ok:
         raise HTTPException(status_code=400, detail="Échange du code échoué")
 
     # Persister le refresh token en DB si disponible
     rt = extractor.spotify_client.spotify_refresh_token
     if rt:
-        tok = db.query(SpotifyToken).filter(SpotifyToken.user_id == uid).first()
-        if not tok:
-            tok = SpotifyToken(user_id=uid)
-        tok.refresh_token = enc.encrypt_str(rt)
-        db.add(tok)
-        db.commit()
+        await run_blocking(_save_refresh_token, db, uid, rt)
+        state.invalidate_user_config(uid)
     return {"status": "ok"}
 
 
@@ -140,6 +148,7 @@ def spotify_logout(
         tok.refresh_token = None
         db.add(tok)
         db.commit()
+    get_state().invalidate_user_config(uid)
     # Nettoyer en mémoire
     extractor = get_state().get_extractor_for_user(uid, db)
     extractor.spotify_client.logout()
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..utils.database import get_db
-from ..utils.security import hash_password, verify_password, gravatar_url
+from ..utils.security import hash_password_async, verify_password_async, gravatar_url
+from ..utils.executor import run_blocking
 from ..utils.auth_dep import get_current_user_id, get_current_user
 from ..models.user import (
     User,
@@ -114,18 +115,24 @@ def update_email(
     return out
 
 
+def _save_password_hash(db: Session, u: User, password_hash: str) -> None:
+    u.password_hash = password_hash
+    db.add(u)
+    db.commit()
+
+
 @router.post("/me/password")
-def change_password(
+async def change_password(
     payload: ChangePasswordIn,
     uid: str = Depends(get_current_user_id),
     db: Session = Depends(get_db),
 ):
-    u = _get_current_user(db, uid)
-    if not verify_password(payload.old_password, u.password_hash):
+    # Async: l'attente d'Argon2 n'occupe pas de thread du threadpool Starlette
+    u = await run_blocking(_get_current_user, db, uid)
+    if not await verify_password_async(payload.old_password, u.password_hash):
         raise HTTPException(status_code=400, detail="Ancien mot de passe invalide")
-    u.password_hash = hash_password(payload.new_password)
-    db.add(u)
-    db.commit()
+    password_hash = await hash_password_async(payload.new_password)
+    await run_blocking(_save_password_hash, db, u, password_hash)
     return {"status": "ok"}
 
 
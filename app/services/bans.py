@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.utils.database import SessionLocal
+from app.models.user import UserBan
+
+
+class BanIndex:
+    """Index process-local des bans actifs: user_id -> fin du ban (None = permanent).
+
+    Les bans sont rares et ne changent que via la modération et le nettoyage:
+    les dépendances d'auth consultent cet index au lieu de requêter api_user_bans.
+    L'index est mis à jour sur les chemins d'écriture et rechargé périodiquement
+    (BAN_CACHE_REFRESH_SECONDS) pour refléter les bans posés par d'autres workers.
+    """
+
+    def __init__(self, refresh_interval: Optional[float] = None) -> None:
+        self.refresh_interval = float(
+            refresh_interval
+            if refresh_interval is not None
+            else os.getenv("BAN_CACHE_REFRESH_SECONDS", "60")
+        )
+        self._until: Dict[str, Optional[datetime]] = {}
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self.stats = {"lookups": 0, "banned_hits": 0, "reloads": 0}
+
+    # --- Lecture ----------------------------------------------------------
+    def is_banned(self, user_id: str, now: Optional[datetime] = None) -> bool:
+        self._ensure_fresh()
+        self.stats["lookups"] += 1
+        with self._lock:
+            if user_id not in self._until:
+                return False
+            until = self._until[user_id]
+            if until is not None and until <= (now or datetime.utcnow()):
+                # Ban temporaire expiré: le retirer de l'index
+                self._until.pop(user_id, None)
+                return False
+        self.stats["banned_hits"] += 1
+        return True
+
+    # --- Écriture ---------------------------------------------------------
+    def refresh_user(self, db: Session, user_id: str) -> None:
+        """Recalcule l'entrée d'un utilisateur depuis la DB (après ban/révocation)."""
+        now = datetime.utcnow()
+        bans = (
+            db.query(UserBan)
+            .filter(
+                UserBan.user_id == user_id,
+                UserBan.revoked_at.is_(None),
+                or_(UserBan.until.is_(None), UserBan.until > now),
+            )
+            .all()
+        )
+        with self._lock:
+            if bans:
+                self._until[user_id] = _longest_until(bans)
+            else:
+                self._until.pop(user_id, None)
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._until.pop(user_id, None)
+
+    def reload(self) -> None:
+        """Recharge l'ensemble des bans actifs."""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            bans = (
+                db.query(UserBan)
+                .filter(
+                    UserBan.revoked_at.is_(None),
+                    or_(UserBan.until.is_(None), UserBan.until > now),
+                )
+                .all()
+            )
+            by_user: Dict[str, list[UserBan]] = {}
+            for b in bans:
+                by_user.setdefault(b.user_id, []).append(b)
+            index = {uid: _longest_until(items) for uid, items in by_user.items()}
+            with self._lock:
+                self._until = index
+                self._loaded_at = time.monotonic()
+            self.stats["reloads"] += 1
+        finally:
+            db.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size = len(self._until)
+        return {"active_bans": size, **self.stats}
+
+    # --- Interne ----------------------------------------------------------
+    def _is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return (
+            loaded_at is not None
+            and time.monotonic() - loaded_at < self.refresh_interval
+        )
+
+    def _ensure_fresh(self) -> None:
+        if self._is_fresh():
+            return
+        # Premier chargement: attendre; ensuite un seul thread recharge, les autres
+        # continuent avec l'index courant
+        if not self._reload_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if not self._is_fresh():
+                self.reload()
+        except Exception:
+            # DB indisponible: garder l'index actuel, réessayer au prochain appel
+            logging.exception("BanIndex: rechargement impossible")
+        finally:
+            self._reload_lock.release()
+
+
+def _longest_until(bans) -> Optional[datetime]:
+    # Un ban permanent l'emporte sur tout ban temporaire
+    if any(b.until is None for b in bans):
+        return None
+    return max(b.until for b in bans)
+
+
+_BAN_INDEX: BanIndex | None = None
+
+
+def get_ban_index() -> BanIndex:
+    global _BAN_INDEX
+    if _BAN_INDEX is None:
+        _BAN_INDEX = BanIndex()
+    return _BAN_INDEX
@@ -7,6 +7,7 @@ from typing import Iterable
 from sqlalchemy.orm import Session
 
 from app.utils.database import SessionLocal
+from app.services.bans import get_ban_index
 from app.models.user import (
     User,
     UserBan,
@@ -20,7 +21,9 @@ from app.models.user import (
     TwoFADisable,
     LoginChallenge,
     UserSetting,
+    TrackColor,
 )
+from app.services.color_extractor_service import COLOR_ALGORITHM_VERSION
 
 
 CLEANUP_INTERVAL_SECONDS = 24 * 3600  # 1 jour
@@ -97,6 +100,8 @@ def purge_permanent_banned_users(now: datetime | None = None) -> int:
                     "Erreur lors de la suppression complète de l'utilisateur %s", uid
                 )
         db.commit()
+        for uid in user_ids:
+            get_ban_index().forget(uid)
         return deleted_users
     except Exception:
         db.rollback()
@@ -108,6 +113,28 @@ def purge_permanent_banned_users(now: datetime | None = None) -> int:
         db.close()
 
 
+def purge_stale_track_colors() -> int:
+    """Supprime les couleurs persistées par une autre version de l'algorithme.
+
+    Retourne le nombre de lignes supprimées.
+    """
+    db = SessionLocal()
+    try:
+        n = (
+            db.query(TrackColor)
+            .filter(TrackColor.algo_version != COLOR_ALGORITHM_VERSION)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return n
+    except Exception:
+        db.rollback()
+        logging.exception("Erreur pendant la purge des couleurs de pochettes obsolètes")
+        return 0
+    finally:
+        db.close()
+
+
 async def cleanup_scheduler(stop_event: asyncio.Event | None = None) -> None:
     """Tâche asynchrone qui exécute la purge chaque jour."""
     while True:
@@ -115,6 +142,9 @@ async def cleanup_scheduler(stop_event: asyncio.Event | None = None) -> None:
             n = purge_permanent_banned_users()
             if n:
                 logging.info("Purge perma-ban: %d utilisateur(s) supprimé(s)", n)
+            n = purge_stale_track_colors()
+            if n:
+                logging.info("Purge couleurs obsolètes: %d ligne(s) supprimée(s)", n)
         except Exception:
             logging.exception("cleanup_scheduler: exception inattendue")
         # Attendre l'intervalle ou un ordre d'arrêt
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Cache de couleurs partagé - URL de pochette -> couleur extraite, pour tout le processus
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+RGB = Tuple[int, int, int]
+
+
+class AlbumColorCache:
+    """LRU borné en nombre d'entrées, TTL optionnel (0 = pas d'expiration).
+
+    Une pochette populaire n'est téléchargée et analysée qu'une fois par
+    processus, quel que soit le nombre d'utilisateurs qui l'écoutent.
+    """
+
+    def __init__(
+        self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None
+    ) -> None:
+        self.max_entries = max(
+            1,
+            int(
+                max_entries
+                if max_entries is not None
+                else os.getenv("ALBUM_COLOR_CACHE_SIZE", "10000")
+            ),
+        )
+        self.ttl_seconds = float(
+            ttl_seconds
+            if ttl_seconds is not None
+            else os.getenv("ALBUM_COLOR_CACHE_TTL_SECONDS", "0")
+        )
+        self.wait_timeout = float(os.getenv("ALBUM_COLOR_WAIT_TIMEOUT_SECONDS", "15"))
+        self._entries: "OrderedDict[str, Tuple[RGB, float]]" = OrderedDict()
+        # Calculs en cours (single-flight): URL -> résultat à venir
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "computations": 0,
+            "coalesced": 0,
+            "wait_timeouts": 0,
+        }
+
+    def get(self, image_url: str) -> Optional[RGB]:
+        if not image_url:
+            return None
+        with self._lock:
+            return self._lookup(image_url)
+
+    def _lookup(self, image_url: str) -> Optional[RGB]:
+        # Appelé sous self._lock
+        entry = self._entries.get(image_url)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        color, stored_at = entry
+        if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[image_url]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(image_url)
+        self.stats["hits"] += 1
+        return color
+
+    async def get_or_compute(
+        self,
+        image_url: str,
+        compute: Callable[[], Awaitable[Optional[RGB]]],
+        timeout: Optional[float] = None,
+    ) -> Optional[RGB]:
+        """Couleur en cache, sinon calcul unique partagé par les appels concurrents.
+
+        Le premier appelant exécute `compute` (téléchargement + analyse); les
+        suivants attendent son résultat (au plus `timeout` secondes, sinon
+        asyncio.TimeoutError) et reçoivent la même exception en cas d'échec.
+        Si le premier appelant est annulé, un suiveur reprend le calcul.
+        Un résultat None (téléchargement impossible) n'est pas mis en cache.
+        """
+        if not image_url:
+            return await compute()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                color = self._lookup(image_url)
+                if color is not None:
+                    return color
+                flight = self._inflight.get(image_url)
+                # Un calcul lancé depuis une autre boucle ne peut pas être attendu ici
+                leader = flight is None or flight.get_loop() is not loop
+                if leader:
+                    flight = loop.create_future()
+                    # Éviter l'avertissement « exception never retrieved » sans suiveur
+                    flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    self._inflight[image_url] = flight
+                    self.stats["computations"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+
+            if leader:
+                return await self._lead(image_url, flight, compute)
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(flight),
+                    timeout=self.wait_timeout if timeout is None else timeout,
+                )
+            except asyncio.TimeoutError:
+                self.stats["wait_timeouts"] += 1
+                raise
+            except asyncio.CancelledError:
+                # Annulation du meneur (pas la nôtre): reprendre le calcul
+                task = asyncio.current_task()
+                if flight.cancelled() and not (task and task.cancelling()):
+                    continue
+                raise
+
+    async def _lead(
+        self,
+        image_url: str,
+        flight: asyncio.Future,
+        compute: Callable[[], Awaitable[Optional[RGB]]],
+    ) -> Optional[RGB]:
+        try:
+            color = await compute()
+            if color is not None:
+                self.put(image_url, color)
+            flight.set_result(color)
+            return color
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(image_url) is flight:
+                    del self._inflight[image_url]
+
+    def put(self, image_url: str, color: RGB) -> None:
+        if not image_url:
+            return
+        with self._lock:
+            self._entries[image_url] = (tuple(color), time.monotonic())
+            self._entries.move_to_end(image_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+            inflight = len(self._inflight)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": size,
+            "in_flight": inflight,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+class ThumbnailCache:
+    """Vignettes d'analyse (octets RGB bruts) partagées, bornées en octets.
+
+    Remplace le cache d'images PIL pleine résolution de chaque extracteur:
+    une vignette 100x100 RGB pèse 30 Ko, quel que soit le nombre d'utilisateurs.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max(
+            0,
+            int(
+                max_bytes
+                if max_bytes is not None
+                else os.getenv("THUMBNAIL_CACHE_BYTES", str(16 * 1024 * 1024))
+            ),
+        )
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, image_url: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(image_url)
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(image_url)
+            self.stats["hits"] += 1
+            return data
+
+    def put(self, image_url: str, data: bytes) -> None:
+        if not image_url or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(image_url, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[image_url] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size, used = len(self._entries), self._bytes
+        return {"entries": size, "bytes": used, "max_bytes": self.max_bytes, **self.stats}
+
+
+_COLOR_CACHE: Optional[AlbumColorCache] = None
+_THUMBNAIL_CACHE: Optional[ThumbnailCache] = None
+
+
+def get_color_cache() -> AlbumColorCache:
+    global _COLOR_CACHE
+    if _COLOR_CACHE is None:
+        _COLOR_CACHE = AlbumColorCache()
+    return _COLOR_CACHE
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    global _THUMBNAIL_CACHE
+    if _THUMBNAIL_CACHE is None:
+        _THUMBNAIL_CACHE = ThumbnailCache()
+    return _THUMBNAIL_CACHE
@@ -4,50 +4,166 @@ Extracteur de couleurs - Analyse d'images et extraction de couleurs dominantes
 """
 
 import io
-import requests
+import os
+import asyncio
+import logging
 from PIL import Image
 
+from app.utils.executor import get_color_process_pool, run_blocking
+from .color_cache import get_thumbnail_cache
+from .http_client import CDN_POOL, get_http_client
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy absent: moteur Python pur
+    np = None
+
+# Chemin rapide (opt-in): pochette 300px décodée en mode draft + bilinéaire.
+# Moins d'octets et de décodage, mais la couleur change sur une bonne part des
+# pochettes (voir bench/bench_cover_thumbnails.py); par défaut, pochette pleine
+# taille + LANCZOS comme historiquement
+FAST_THUMBNAILS = os.getenv("COLOR_FAST_THUMBNAILS", "false").lower() == "true"
+
+# Version de l'algorithme: à incrémenter dès que la couleur produite change
+# (invalide les couleurs persistées dans api_track_colors)
+# v2: chemin rapide (COLOR_FAST_THUMBNAILS)
+COLOR_ALGORITHM_VERSION = 2 if FAST_THUMBNAILS else 1
+
+# Taille de la vignette d'analyse et quantification des groupes de couleurs
+ANALYSIS_SIZE = 100
+GROUP_STEP = 20
+_GROUP_LEVELS = 256 // GROUP_STEP + 1  # 13 niveaux par canal (0..12)
+
+
+def decode_thumbnail(data: bytes, fast: bool | None = None) -> Image.Image:
+    """Décode une pochette en vignette RGB ANALYSIS_SIZE x ANALYSIS_SIZE.
+
+    Chemin rapide (fast, def COLOR_FAST_THUMBNAILS): pour un JPEG, draft()
+    laisse libjpeg décoder à l'échelle 1/2, 1/4 ou 1/8 (sans descendre sous
+    la taille d'analyse) puis filtre bilinéaire. Sinon décodage complet et
+    LANCZOS, identique à l'analyse historique.
+    """
+    fast = FAST_THUMBNAILS if fast is None else fast
+    image = Image.open(io.BytesIO(data))
+    if fast and image.format == "JPEG":
+        image.draft("RGB", (ANALYSIS_SIZE, ANALYSIS_SIZE))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.size != (ANALYSIS_SIZE, ANALYSIS_SIZE):
+        if fast:
+            image = image.resize(
+                (ANALYSIS_SIZE, ANALYSIS_SIZE),
+                Image.Resampling.BILINEAR,
+                reducing_gap=2.0,
+            )
+        else:
+            image = image.resize(
+                (ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.LANCZOS
+            )
+    return image
+
+
+def extract_color_from_bytes(data: bytes, engine: str | None = None):
+    """Couleur principale (tuple RGB) d'une pochette encodée.
+
+    Fonction de module (picklable) exécutée dans le pool de processus.
+    """
+    global _BYTES_EXTRACTOR
+    if _BYTES_EXTRACTOR is None or (engine and _BYTES_EXTRACTOR.engine != engine):
+        _BYTES_EXTRACTOR = ColorExtractor(engine)
+    return _BYTES_EXTRACTOR.extract_primary_color(decode_thumbnail(data))
+
+
+_BYTES_EXTRACTOR = None
+
 
 class ColorExtractor:
-    def __init__(self):
-        self.image_cache = {}  # Cache pour les images téléchargées
-        self.session = requests.Session()  # Session persistante
+    def __init__(self, engine: str | None = None):
+        # Moteur d'analyse: "numpy" (vectorisé) ou "python" (historique)
+        self.engine = (
+            (engine or os.getenv("COLOR_EXTRACTOR_ENGINE", "numpy")).strip().lower()
+        )
+
+    async def fetch_image_bytes(self, image_url):
+        """Télécharger les octets bruts (JPEG) d'une pochette"""
+        try:
+            response = await get_http_client(CDN_POOL).get(image_url)
+            if response.status_code == 200:
+                return response.content
+            return None
+        except Exception:
+            return None
 
-    def download_image(self, image_url):
+    async def download_image(self, image_url):
         """Télécharger une image depuis une URL"""
         if not image_url:
             return None
 
-        # Vérifier le cache d'images
-        if image_url in self.image_cache:
-            return self.image_cache[image_url]
+        # Vignette déjà décodée (cache global borné en octets)
+        thumbnails = get_thumbnail_cache()
+        data = thumbnails.get(image_url)
+        if data is not None:
+            return Image.frombytes("RGB", (ANALYSIS_SIZE, ANALYSIS_SIZE), data)
 
+        raw = await self.fetch_image_bytes(image_url)
+        if raw is None:
+            return None
         try:
-            response = self.session.get(image_url, timeout=10, stream=True)
-            if response.status_code == 200:
-                image = Image.open(io.BytesIO(response.content))
-                if image.mode != "RGB":
-                    image = image.convert("RGB")
-
-                # Mettre en cache (limiter à 10 images max)
-                if len(self.image_cache) >= 10:
-                    oldest_key = next(iter(self.image_cache))
-                    del self.image_cache[oldest_key]
-
-                self.image_cache[image_url] = image
-                return image
-            else:
-                return None
+            # Décodage (CPU) hors de la boucle d'événements
+            image = await run_blocking(decode_thumbnail, raw)
         except Exception:
             return None
+        # Mettre en cache la vignette seule (30 Ko), pas l'image source
+        thumbnails.put(image_url, image.tobytes())
+        return image
+
+    async def extract_color_from_url(self, image_url):
+        """Télécharger puis analyser une pochette; None si indisponible.
+
+        Avec COLOR_EXTRACTION_PROCESSES > 0, le décodage et l'analyse partent
+        dans le pool de processus (seuls les octets JPEG et le tuple RGB
+        traversent la frontière) et ne tiennent plus le GIL du serveur.
+        """
+        pool = get_color_process_pool()
+        if pool is None or get_thumbnail_cache().get(image_url) is not None:
+            image = await self.download_image(image_url)
+            if not image:
+                return None
+            return await run_blocking(self.extract_primary_color, image)
+        raw = await self.fetch_image_bytes(image_url)
+        if raw is None:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                pool, extract_color_from_bytes, raw, self.engine
+            )
+        except Exception as e:
+            logging.warning(f"⚠️ Extraction en processus impossible, repli local: {e}")
+            return await run_blocking(extract_color_from_bytes, raw, self.engine)
 
     def extract_primary_color(self, image):
         """Extraction couleur NATURELLE mais AMPLIFIÉE"""
-        # Redimensionner pour optimiser
-        image = image.resize((100, 100), Image.Resampling.LANCZOS)
+        # Redimensionner pour optimiser (sans effet sur une vignette déjà réduite)
+        if image.size != (ANALYSIS_SIZE, ANALYSIS_SIZE):
+            image = image.resize(
+                (ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.LANCZOS
+            )
         if image.mode != "RGB":
             image = image.convert("RGB")
 
+        if self.engine == "numpy" and np is not None:
+            try:
+                most_vibrant_color = self._find_most_vibrant_color_np(
+                    np.asarray(image)
+                )
+                return self._amplify_saturation(
+                    most_vibrant_color[0], most_vibrant_color[1], most_vibrant_color[2]
+                )
+            except Exception as e:
+                # Ne jamais perdre la couleur: repli sur le moteur historique
+                logging.warning(f"⚠️ Moteur numpy indisponible, repli Python: {e}")
+
         pixels = list(image.getdata())
 
         # Filtrer les pixels trop sombres pour l'analyse
@@ -137,6 +253,62 @@ class ColorExtractor:
         # Fallback final
         return (255, 0, 150)
 
+    def _find_most_vibrant_color_np(self, arr):
+        """Version vectorisée de _find_most_vibrant_color (résultat identique).
+
+        Reproduit exactement le moteur Python: filtre de luminosité, saturation,
+        groupes de 20 (bincount sur des clés compactées), score fréquence +
+        saturation, et départage des ex aequo par ordre de première apparition.
+        """
+        pixels = arr.reshape(-1, 3).astype(np.int64)
+        if len(pixels) == 0:
+            return (255, 0, 150)  # Fallback rose
+
+        # Filtrer les pixels trop sombres (fallback si image très sombre)
+        bright = pixels[pixels.sum(axis=1) / 3 > 30]
+        if len(bright) == 0:
+            bright = pixels
+        total = len(bright)
+
+        max_val = bright.max(axis=1)
+        min_val = bright.min(axis=1)
+        saturation = np.zeros(total, dtype=np.float64)
+        nonzero = max_val > 0
+        saturation[nonzero] = (max_val[nonzero] - min_val[nonzero]) / max_val[nonzero]
+
+        # Ignorer les pixels trop peu saturés (gris)
+        keep = saturation >= 0.2
+        if not keep.any():
+            # Fallback : prendre la couleur la plus lumineuse (première rencontrée)
+            brightest = bright[int(np.argmax(bright.sum(axis=1)))]
+            return (int(brightest[0]), int(brightest[1]), int(brightest[2]))
+
+        selected = bright[keep]
+        groups = selected // GROUP_STEP
+        keys = (groups[:, 0] * _GROUP_LEVELS + groups[:, 1]) * _GROUP_LEVELS + groups[
+            :, 2
+        ]
+        size = _GROUP_LEVELS**3
+        counts = np.bincount(keys, minlength=size)
+        saturation_sums = np.bincount(keys, weights=saturation[keep], minlength=size)
+
+        # Groupes présents, dans l'ordre de première apparition (comme le dict Python)
+        present, first_index = np.unique(keys, return_index=True)
+        order = np.argsort(first_index, kind="stable")
+        present = present[order]
+
+        avg_saturation = saturation_sums[present] / counts[present]
+        frequency_weight = counts[present] / total
+        scores = frequency_weight * 0.7 + avg_saturation * 0.3
+        # argmax renvoie le premier maximum: même départage que `score > best_score`
+        best_key = present[int(np.argmax(scores))]
+
+        # Couleur moyenne du meilleur groupe (sommes entières, division Python)
+        members = selected[keys == best_key]
+        count = len(members)
+        total_r, total_g, total_b = (int(v) for v in members.sum(axis=0))
+        return (total_r / count, total_g / count, total_b / count)
+
     def _amplify_saturation(self, r, g, b):
         """Amplifier LÉGÈREMENT la saturation d'une couleur en préservant sa teinte"""
         # Convertir en HSV pour manipuler la saturation
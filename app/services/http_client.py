@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Client HTTP asynchrone partagé - Pool de connexions keep-alive pour Spotify et le CDN
+"""
+
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+import importlib.util
+import weakref
+from typing import Dict
+
+import httpx
+
+# Pools séparés par famille d'hôtes: les limites de connexions s'appliquent
+# par hôte (api/accounts.spotify.com d'un côté, CDN des pochettes de l'autre)
+SPOTIFY_POOL = "spotify"
+CDN_POOL = "cdn"
+
+HTTP2_ENABLED = (
+    os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true"
+    and importlib.util.find_spec("h2") is not None
+)
+
+_POOL_LIMITS = {
+    SPOTIFY_POOL: int(os.getenv("SPOTIFY_HTTP_MAX_CONNECTIONS", "50")),
+    CDN_POOL: int(os.getenv("CDN_HTTP_MAX_CONNECTIONS", "20")),
+}
+
+
+def _build_client(pool: str) -> httpx.AsyncClient:
+    max_connections = max(1, _POOL_LIMITS.get(pool, 20))
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60")),
+        ),
+        timeout=httpx.Timeout(
+            connect=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3")),
+            read=float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "5")),
+            write=5.0,
+            pool=float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "5")),
+        ),
+    )
+
+
+# Un client par boucle d'événements (un AsyncClient ne peut pas changer de boucle)
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client(pool: str = SPOTIFY_POOL) -> httpx.AsyncClient:
+    """Client partagé du pool demandé pour la boucle courante."""
+    loop = asyncio.get_running_loop()
+    clients = _CLIENTS.setdefault(loop, {})
+    client = clients.get(pool)
+    if client is None or client.is_closed:
+        client = _build_client(pool)
+        clients[pool] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Fermer les clients de la boucle courante (arrêt de l'application)."""
+    clients = _CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            await client.aclose()
+        except Exception:
+            logging.exception("Fermeture du client HTTP impossible")
@@ -1,16 +1,259 @@
-from typing import Dict, Set
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
 from fastapi import WebSocket
+from .realtime_broker import RealtimeBroker, InProcessBroker, build_broker
+
+# Messages d'état: seul le plus récent compte, un envoi en attente est remplacé
+COALESCED_TYPES = frozenset({"track_update", "ping"})
+# Fermeture d'un client trop lent (file saturée ou envoi bloqué)
+SLOW_CLIENT_CLOSE_CODE = 4408
+# Fermeture d'un client qui répondait aux pings et s'est tu (voir _heartbeat)
+HEARTBEAT_CLOSE_CODE = 4410
+# Fermeture de la plus ancienne connexion au-delà de WS_MAX_PER_USER
+TOO_MANY_CONNECTIONS_CLOSE_CODE = 4429
+
+
+class _Outbox:
+    """File d'envoi bornée d'une connexion, vidée par sa propre tâche d'écriture.
+
+    Un client lent ou à moitié mort ne retarde plus les autres sockets:
+    l'émetteur ne fait qu'empiler, sans jamais attendre le réseau.
+    """
+
+    def __init__(
+        self, manager: "ConnectionManager", user_id: str, websocket: WebSocket, public: bool
+    ) -> None:
+        self.manager = manager
+        self.user_id = user_id
+        self.websocket = websocket
+        self.public = public
+        self._pending: Deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._close: Optional[Tuple[int, str]] = None
+        # Messages écartés (remplacés ou perdus) depuis le dernier envoi réussi
+        self.skipped = 0
+        self.closed = False
+        # Dernier signe de vie du client (message reçu), monotonic
+        self.last_seen = self.connected_at = time.monotonic()
+        # Le client a déjà envoyé un message: il parle le heartbeat et peut
+        # être fermé s'il se tait (les anciens clients n'envoient rien)
+        self.answered = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def offer(self, message: dict) -> bool:
+        """Empiler sans bloquer; False si le message est perdu."""
+        if self.closed or self._close is not None:
+            return False
+        stats = self.manager.queue_stats
+        if message.get("type") in COALESCED_TYPES:
+            for i, queued in enumerate(self._pending):
+                if queued.get("type") == message.get("type"):
+                    del self._pending[i]
+                    stats["coalesced"] += 1
+                    self.skipped += 1
+                    break
+        accepted = len(self._pending) < self.manager.queue_size
+        if accepted:
+            self._pending.append(message)
+            stats["enqueued"] += 1
+            self._wakeup.set()
+        else:
+            stats["dropped"] += 1
+            self.skipped += 1
+        if self.skipped >= self.manager.slow_max_skipped:
+            stats["slow_disconnects"] += 1
+            self.retire(SLOW_CLIENT_CLOSE_CODE, "slow consumer")
+        return accepted
+
+    def retire(self, code: int, reason: str) -> None:
+        """Fermer sans vider la file: client mort ou remplacé."""
+        self._pending.clear()
+        self.close(code, reason)
+
+    def close(self, code: int, reason: str) -> None:
+        """Fermer après l'envoi des messages déjà en file (force_logout...)."""
+        if self._close is None:
+            self._close = (code, reason)
+            self._wakeup.set()
+
+    def cancel(self) -> None:
+        self.closed = True
+        # Pas d'auto-annulation quand la tâche d'écriture se retire elle-même
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        stats = self.manager.queue_stats
+        timeout = self.manager.send_timeout
+        try:
+            while True:
+                while not self._pending and self._close is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self._pending:
+                    message = self._pending.popleft()
+                    try:
+                        await asyncio.wait_for(
+                            self.websocket.send_json(message), timeout=timeout
+                        )
+                    except asyncio.TimeoutError:
+                        stats["send_timeouts"] += 1
+                        if self._close is None:
+                            stats["slow_disconnects"] += 1
+                        self._close = (SLOW_CLIENT_CLOSE_CODE, "slow consumer")
+                        self._pending.clear()
+                        continue
+                    stats["sent"] += 1
+                    self.skipped = 0
+                    continue
+                code, reason = self._close
+                await asyncio.wait_for(
+                    self.websocket.close(code=code, reason=reason), timeout=timeout
+                )
+                return
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Socket déjà fermée ou transport mort: la connexion est abandonnée
+            stats["send_errors"] += 1
+            logging.debug("[WS] envoi impossible, connexion retirée", exc_info=True)
+        finally:
+            self.closed = True
+            self.manager._forget(self)
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
+    """Sockets de ce worker; les messages ciblant un utilisateur (send, close,
+    kick) passent par le bus pour atteindre tous les workers."""
+
+    def __init__(self, broker: Optional[RealtimeBroker] = None) -> None:
         # Map user_id -> set of websockets
         self._by_user: Dict[str, Set[WebSocket]] = {}
+        # Canaux publics en lecture seule (overlays OBS): user_id -> websockets.
+        # Séparés des connexions du propriétaire: ils ne reçoivent que le flux
+        # piste/couleur, jamais les messages privés (force_logout...)
+        self._public: Dict[str, Set[WebSocket]] = {}
+        # websocket -> file d'envoi (propriétaire et canal public)
+        self._outboxes: Dict[WebSocket, _Outbox] = {}
+        self.public_max_per_channel = max(
+            1, int(os.getenv("PUBLIC_WS_MAX_PER_CHANNEL", "200"))
+        )
+        self.queue_size = max(1, int(os.getenv("WS_SEND_QUEUE_SIZE", "32")))
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+        self.slow_max_skipped = max(
+            1, int(os.getenv("WS_SLOW_CLIENT_MAX_SKIPPED", "100"))
+        )
+        self.max_per_user = max(1, int(os.getenv("WS_MAX_PER_USER", "10")))
+        # Ping applicatif: 0 désactive le heartbeat
+        self.ping_interval = float(os.getenv("WS_PING_INTERVAL_SECONDS", "25"))
+        self.pong_timeout = float(os.getenv("WS_PONG_TIMEOUT_SECONDS", "20"))
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.public_stats = {"subscribed": 0, "rejected_full": 0, "broadcasts": 0}
+        self.heartbeat_stats = {"pings": 0, "reaped": 0, "evicted_over_cap": 0}
+        self.queue_stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "send_timeouts": 0,
+            "send_errors": 0,
+            "slow_disconnects": 0,
+        }
+        self.broker = broker or InProcessBroker()
+        self.broker.bind(self._dispatch)
+
+    async def start(self) -> None:
+        await self.broker.start()
+        if self.ping_interval > 0 and self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await self.broker.stop()
+
+    async def _heartbeat(self) -> None:
+        """Ping applicatif des sockets silencieuses.
+
+        Tout message reçu du client (pong ou autre) compte comme signe de vie.
+        Seuls les clients ayant déjà répondu sont fermés (4410): les fronts
+        actuels n'envoient rien. Les pairs morts (veille, crash OBS) sont
+        détectés par le ping protocolaire d'uvicorn (--ws-ping-interval /
+        --ws-ping-timeout), auquel les navigateurs répondent d'eux-mêmes.
+        """
+        tick = max(1.0, min(self.ping_interval, self.pong_timeout or self.ping_interval) / 2)
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                self.heartbeat_once()
+            except Exception:
+                logging.exception("[WS] heartbeat: exception inattendue")
+
+    def heartbeat_once(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        for outbox in list(self._outboxes.values()):
+            if outbox.closed:
+                continue
+            silent = now - outbox.last_seen
+            if outbox.answered and silent >= self.ping_interval + self.pong_timeout:
+                self.heartbeat_stats["reaped"] += 1
+                self._retire(outbox, HEARTBEAT_CLOSE_CODE, "heartbeat timeout")
+            elif silent >= self.ping_interval and outbox.offer(
+                {"type": "ping", "ts": int(time.time())}
+            ):
+                self.heartbeat_stats["pings"] += 1
+
+    def touch(self, websocket: WebSocket) -> None:
+        """Message reçu du client: la connexion est vivante."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            outbox.last_seen = time.monotonic()
+            outbox.answered = True
+
+    def _retire(self, outbox: _Outbox, code: int, reason: str) -> None:
+        # Retirée des destinataires tout de suite; la tâche d'écriture envoie
+        # la fermeture puis libère l'entrée (_forget)
+        registry = self._public if outbox.public else self._by_user
+        conns = registry.get(outbox.user_id)
+        if conns is not None:
+            conns.discard(outbox.websocket)
+            if not conns:
+                registry.pop(outbox.user_id, None)
+        outbox.retire(code, reason)
 
     async def connect(self, user_id: str, websocket: WebSocket):
+        conns = self._by_user.setdefault(user_id, set())
+        # Plafond par utilisateur: la connexion la plus ancienne cède sa place
+        # (souvent un onglet ou un OBS disparu pas encore détecté)
+        while len(conns) >= self.max_per_user:
+            oldest = min(
+                (self._outboxes[ws] for ws in conns if ws in self._outboxes),
+                key=lambda outbox: outbox.connected_at,
+                default=None,
+            )
+            if oldest is None:
+                break
+            self.heartbeat_stats["evicted_over_cap"] += 1
+            self._retire(oldest, TOO_MANY_CONNECTIONS_CLOSE_CODE, "too many connections")
+        # _retire retire l'entrée quand l'ensemble se vide: la recréer au besoin
         self._by_user.setdefault(user_id, set()).add(websocket)
+        self._outboxes[websocket] = _Outbox(self, user_id, websocket, public=False)
 
     def disconnect(self, user_id: str, websocket: WebSocket):
+        self._drop_outbox(websocket)
         conns = self._by_user.get(user_id)
         if not conns:
             return
@@ -18,18 +261,113 @@ class ConnectionManager:
         if not conns:
             self._by_user.pop(user_id, None)
 
-    async def send_to_user(self, user_id: str, message: dict):
-        conns = self._by_user.get(user_id)
+    def subscribe_public(self, user_id: str, websocket: WebSocket) -> bool:
+        """Ajoute un spectateur au canal public; False si le canal est plein."""
+        conns = self._public.setdefault(user_id, set())
+        if len(conns) >= self.public_max_per_channel:
+            if not conns:
+                self._public.pop(user_id, None)
+            self.public_stats["rejected_full"] += 1
+            return False
+        conns.add(websocket)
+        self._outboxes[websocket] = _Outbox(self, user_id, websocket, public=True)
+        self.public_stats["subscribed"] += 1
+        return True
+
+    def unsubscribe_public(self, user_id: str, websocket: WebSocket):
+        self._drop_outbox(websocket)
+        conns = self._public.get(user_id)
         if not conns:
             return
-        dead: Set[WebSocket] = set()
-        for ws in conns:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                dead.add(ws)
-        for ws in dead:
-            self.disconnect(user_id, ws)
+        conns.discard(websocket)
+        if not conns:
+            self._public.pop(user_id, None)
+
+    def _drop_outbox(self, websocket: WebSocket) -> None:
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.cancel()
+
+    def _forget(self, outbox: _Outbox) -> None:
+        # Appelé par la tâche d'écriture à sa sortie (client parti ou trop lent)
+        if self._outboxes.get(outbox.websocket) is not outbox:
+            return
+        if outbox.public:
+            self.unsubscribe_public(outbox.user_id, outbox.websocket)
+        else:
+            self.disconnect(outbox.user_id, outbox.websocket)
+
+    def has_subscribers(self, user_id: str) -> bool:
+        return bool(self._by_user.get(user_id)) or bool(self._public.get(user_id))
+
+    def subscriber_count(self) -> int:
+        return sum(len(conns) for conns in self._by_user.values()) + sum(
+            len(conns) for conns in self._public.values()
+        )
+
+    def get_stats(self, top: int = 10) -> dict:
+        channels = sorted(
+            ((uid, len(conns)) for uid, conns in self._public.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        depths = [outbox.depth for outbox in self._outboxes.values()]
+        users = sorted(
+            ((uid, len(conns)) for uid, conns in self._by_user.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return {
+            "open_sockets": len(self._outboxes),
+            "user_sockets": sum(n for _, n in users),
+            "users": len(users),
+            "max_per_user": self.max_per_user,
+            "top_users": [{"user_id": uid, "sockets": n} for uid, n in users[:top]],
+            "public_channels": len(channels),
+            "public_sockets": sum(n for _, n in channels),
+            "public_max_per_channel": self.public_max_per_channel,
+            **self.public_stats,
+            "top_channels": [{"user_id": uid, "viewers": n} for uid, n in channels[:top]],
+            "send_queues": {
+                "size": self.queue_size,
+                "pending": sum(depths),
+                "max_depth": max(depths, default=0),
+                **self.queue_stats,
+            },
+            "heartbeat": {
+                "ping_interval": self.ping_interval,
+                "pong_timeout": self.pong_timeout,
+                **self.heartbeat_stats,
+            },
+            "broker": self.broker.get_stats(),
+        }
+
+    def send_to_socket(self, websocket: WebSocket, message: dict) -> bool:
+        """Empiler un message pour une seule connexion (état initial...)."""
+        outbox = self._outboxes.get(websocket)
+        return outbox.offer(message) if outbox is not None else False
+
+    def _offer_all(self, conns: Optional[Set[WebSocket]], message: dict) -> None:
+        for ws in list(conns or ()):
+            outbox = self._outboxes.get(ws)
+            if outbox is not None:
+                outbox.offer(message)
+
+    async def broadcast(self, user_id: str, message: dict):
+        """Flux piste/couleur: connexions du propriétaire + canal public.
+
+        Reste local: chaque worker suit lui-même les utilisateurs dont il
+        détient les sockets (voir routes/realtime.py).
+        """
+        self._offer_all(self._by_user.get(user_id), message)
+        conns = self._public.get(user_id)
+        if not conns:
+            return
+        self.public_stats["broadcasts"] += 1
+        self._offer_all(conns, message)
+
+    async def send_to_user(self, user_id: str, message: dict):
+        await self.broker.publish({"op": "send", "user": user_id, "message": message})
 
     async def kick_user(self, user_id: str, reason: str = "banned"):
         await self.send_to_user(user_id, {"type": "force_logout", "reason": reason})
@@ -39,17 +377,27 @@ class ConnectionManager:
     async def close_user(
         self, user_id: str, code: int = 4401, reason: str = "unauthorized"
     ):
-        conns = self._by_user.get(user_id)
+        await self.broker.publish(
+            {"op": "close", "user": user_id, "code": code, "reason": reason}
+        )
+
+    async def _dispatch(self, envelope: dict) -> None:
+        """Enveloppe reçue du bus: livraison aux sockets de ce worker."""
+        user_id = envelope.get("user")
+        conns = self._by_user.get(user_id) if user_id else None
         if not conns:
             return
-        dead: Set[WebSocket] = set()
-        for ws in list(conns):
-            try:
-                await ws.close(code=code, reason=reason)
-            except Exception:
-                dead.add(ws)
-        for ws in dead:
-            self.disconnect(user_id, ws)
+        op = envelope.get("op")
+        if op == "send":
+            # Mise en file uniquement: les tâches d'écriture gèrent le réseau
+            self._offer_all(conns, envelope.get("message") or {})
+        elif op == "close":
+            code = int(envelope.get("code") or 4401)
+            reason = str(envelope.get("reason") or "unauthorized")
+            for ws in list(conns):
+                outbox = self._outboxes.get(ws)
+                if outbox is not None:
+                    outbox.close(code, reason)
 
 
 _MANAGER: ConnectionManager | None = None
@@ -58,5 +406,5 @@ _MANAGER: ConnectionManager | None = None
 def get_manager() -> ConnectionManager:
     global _MANAGER
     if _MANAGER is None:
-        _MANAGER = ConnectionManager()
+        _MANAGER = ConnectionManager(broker=build_broker())
     return _MANAGER
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Bus temps réel - Diffusion des messages WebSocket à tous les workers (en mémoire ou Redis pub/sub)
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Optional
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class RealtimeBroker(ABC):
+    """Interface: publish() diffuse une enveloppe, chaque worker abonné la
+    reçoit dans le handler lié par ConnectionManager (y compris l'émetteur).
+    """
+
+    name = "abstract"
+    # True si les enveloppes traversent les processus
+    distributed = False
+
+    def __init__(self) -> None:
+        self._handler: Optional[Handler] = None
+        self.stats = {"published": 0, "received": 0, "publish_errors": 0}
+
+    def bind(self, handler: Handler) -> None:
+        self._handler = handler
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    @abstractmethod
+    async def publish(self, envelope: dict) -> None:
+        """Diffuser une enveloppe à tous les workers abonnés."""
+
+    async def _deliver(self, envelope: dict) -> None:
+        self.stats["received"] += 1
+        if self._handler is None:
+            return
+        try:
+            await self._handler(envelope)
+        except Exception:
+            logging.exception("[WS] distribution d'un message impossible")
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, "distributed": self.distributed, **self.stats}
+
+
+class InProcessBroker(RealtimeBroker):
+    """Un seul processus: livraison directe aux sockets locales."""
+
+    name = "in_process"
+
+    async def publish(self, envelope: dict) -> None:
+        self.stats["published"] += 1
+        await self._deliver(envelope)
+
+
+class RedisBroker(RealtimeBroker):
+    """Redis pub/sub: chaque worker s'abonne au canal et livre à ses sockets.
+
+    Ne transporte que les messages ciblés (send/close/kick). Le flux
+    track_update (ConnectionManager.broadcast) reste local: chaque worker
+    interroge Spotify pour ses propres abonnés, avec ses propres extracteurs.
+
+    `client` permet d'injecter un client compatible redis.asyncio (tests);
+    sinon il est créé depuis `url` (dépendance optionnelle `redis`).
+    """
+
+    name = "redis"
+    distributed = True
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        channel: Optional[str] = None,
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self.channel = channel or os.getenv("REALTIME_BROKER_CHANNEL", "melodyhue:realtime")
+        self._client = client
+        self._owns_client = client is None
+        self._pubsub: Any = None
+        self._listener: Optional[asyncio.Task] = None
+        self._running = False
+        self.stats["listener_restarts"] = 0
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError as exc:  # pragma: no cover - dépend de l'installation
+                raise RuntimeError(
+                    "REALTIME_BROKER_URL requiert le paquet 'redis' (pip install redis)"
+                ) from exc
+            self._client = aioredis.from_url(self.url)
+        return self._client
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._get_client()
+        self._running = True
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        await self._close_pubsub()
+        if self._owns_client and self._client is not None:
+            close = getattr(self._client, "aclose", None) or self._client.close
+            try:
+                await close()
+            except Exception:
+                logging.exception("[WS] fermeture du client Redis impossible")
+            self._client = None
+
+    async def publish(self, envelope: dict) -> None:
+        payload = json.dumps(envelope)
+        try:
+            await self._get_client().publish(self.channel, payload)
+            self.stats["published"] += 1
+        except Exception:
+            # Redis indisponible: au moins les sockets de ce worker sont servies
+            self.stats["publish_errors"] += 1
+            logging.exception("[WS] publication Redis impossible, livraison locale")
+            await self._deliver(envelope)
+
+    async def _listen(self) -> None:
+        while self._running:
+            try:
+                self._pubsub = self._get_client().pubsub()
+                await self._pubsub.subscribe(self.channel)
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    try:
+                        envelope = json.loads(data)
+                    except (TypeError, ValueError):
+                        logging.warning("[WS] message Redis illisible ignoré")
+                        continue
+                    await self._deliver(envelope)
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                logging.exception("[WS] abonnement Redis interrompu, reconnexion")
+            await self._close_pubsub()
+            if not self._running:
+                break
+            self.stats["listener_restarts"] += 1
+            await asyncio.sleep(1.0)
+
+    async def _close_pubsub(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.unsubscribe(self.channel)
+            close = getattr(pubsub, "aclose", None) or pubsub.close
+            await close()
+        except Exception:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            **super().get_stats(),
+            "channel": self.channel,
+            "listening": self._listener is not None and not self._listener.done(),
+        }
+
+
+def build_broker(url: Optional[str] = None) -> RealtimeBroker:
+    """Bus choisi par REALTIME_BROKER_URL (redis:// ou rediss://); vide = en mémoire."""
+    url = (url if url is not None else os.getenv("REALTIME_BROKER_URL", "")).strip()
+    if not url:
+        return InProcessBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url=url)
+    raise ValueError(f"REALTIME_BROKER_URL non supportée: {url.split('://', 1)[0]}://")
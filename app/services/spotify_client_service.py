@@ -9,13 +9,34 @@ import json
 import base64
 import logging
 from typing import Callable, Optional
-import requests
 from urllib.parse import urlencode
 from dotenv import load_dotenv
 
+from .color_extractor_service import ANALYSIS_SIZE, FAST_THUMBNAILS
+from .http_client import get_http_client
+from .spotify_rate_limiter import get_rate_limiter
+
 load_dotenv()
 
 
+def pick_analysis_image(images, min_size: int = ANALYSIS_SIZE):
+    """Plus petite pochette d'au moins min_size px (Spotify: 640, 300, 64).
+
+    À défaut (toutes plus petites ou tailles inconnues), la plus grande.
+    """
+    sized = [img for img in images or [] if img.get("url")]
+    if not sized:
+        return None
+    large_enough = [
+        img
+        for img in sized
+        if min(img.get("width") or 0, img.get("height") or 0) >= min_size
+    ]
+    if large_enough:
+        return min(large_enough, key=lambda img: img.get("width") or 0)["url"]
+    return max(sized, key=lambda img: img.get("width") or 0)["url"]
+
+
 class SpotifyClient:
     def __init__(self, persist_to_file: bool = False):
         self._persist_to_file = bool(persist_to_file)
@@ -46,6 +67,10 @@ class SpotifyClient:
 
         self._last_spotify_check = 0
         self._last_spotify_result = None
+        # Dernier appel servi depuis le cache à cause du limiteur (voir throttle_wait)
+        self.throttled = False
+        # État throttled du résultat mémorisé, rendu avec lui pendant 1 s
+        self._last_spotify_throttled = False
 
         self._setup_spotify()
 
@@ -57,22 +82,30 @@ class SpotifyClient:
         if client_id and client_secret:
             refresh_token = env_refresh or self._load_refresh_token()
             if self.configure_spotify_api(client_id, client_secret, refresh_token):
-                if self._test_spotify_api():
-                    logging.info("✅ Spotify API connectée")
-                    return True
+                logging.info("✅ Spotify API configurée")
+                return True
 
         logging.warning("⚠️ Spotify API non configurée")
         return False
 
     def configure_spotify_api(self, client_id, client_secret, refresh_token=None):
+        """Enregistrer les identifiants, sans appel réseau.
+
+        Le token d'accès est obtenu paresseusement au premier appel API.
+        """
+        if (client_id, client_secret, refresh_token) != (
+            self.spotify_client_id,
+            self.spotify_client_secret,
+            self.spotify_refresh_token,
+        ):
+            # Nouveaux identifiants: ne pas réutiliser le token précédent
+            self.spotify_access_token = None
+            self.spotify_token_expires = 0
         self.spotify_client_id = client_id
         self.spotify_client_secret = client_secret
         self.spotify_refresh_token = refresh_token
-
-        if self._get_spotify_access_token():
-            self.spotify_enabled = True
-            return True
-        return False
+        self.spotify_enabled = bool(client_id and client_secret)
+        return self.spotify_enabled
 
     def _load_refresh_token(self):
         if not self._persist_to_file:
@@ -146,13 +179,13 @@ class SpotifyClient:
             return False
         return False
 
-    def _get_spotify_access_token(self):
+    async def _get_spotify_access_token(self):
         if self._load_access_token():
             return True
 
         try:
             if self.spotify_refresh_token:
-                success = self._refresh_access_token()
+                success = await self._refresh_access_token()
                 if success:
                     return True
 
@@ -167,7 +200,7 @@ class SpotifyClient:
             }
             data = {"grant_type": "client_credentials"}
 
-            response = requests.post(url, headers=headers, data=data, timeout=10)
+            response = await get_http_client().post(url, headers=headers, data=data)
 
             if response.status_code == 200:
                 token_data = response.json()
@@ -181,7 +214,7 @@ class SpotifyClient:
         except Exception:
             return False
 
-    def _refresh_access_token(self):
+    async def _refresh_access_token(self):
         try:
             auth_string = f"{self.spotify_client_id}:{self.spotify_client_secret}"
             auth_bytes = auth_string.encode("utf-8")
@@ -197,7 +230,7 @@ class SpotifyClient:
                 "refresh_token": self.spotify_refresh_token,
             }
 
-            response = requests.post(url, headers=headers, data=data, timeout=10)
+            response = await get_http_client().post(url, headers=headers, data=data)
 
             if response.status_code == 200:
                 token_data = response.json()
@@ -220,47 +253,26 @@ class SpotifyClient:
         except Exception:
             return False
 
-    def _test_spotify_api(self):
-        if not self.spotify_enabled:
-            return False
-
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.spotify_access_token}",
-                "Content-Type": "application/json",
-            }
-
-            if self.spotify_refresh_token:
-                response = requests.get(
-                    "https://api.spotify.com/v1/me/player/currently-playing",
-                    headers=headers,
-                    timeout=5,
-                )
-                return response.status_code in [200, 204]
-            else:
-                response = requests.get(
-                    "https://api.spotify.com/v1/browse/categories",
-                    headers=headers,
-                    params={"limit": 1},
-                    timeout=5,
-                )
-                return response.status_code == 200
-        except:
-            return False
-
-    def get_current_track(self):
+    async def get_current_track(self):
         if not self.spotify_enabled:
             return None
 
         now = time.time()
         if now - self._last_spotify_check < 1:
+            self.throttled = self._last_spotify_throttled
             return self._last_spotify_result
 
         self._last_spotify_check = now
+        self.throttled = False
+        try:
+            return await self._fetch_current_track()
+        finally:
+            self._last_spotify_throttled = self.throttled
 
+    async def _fetch_current_track(self):
         try:
             if time.time() > self.spotify_token_expires:
-                self._get_spotify_access_token()
+                await self._get_spotify_access_token()
 
             headers = {
                 "Authorization": f"Bearer {self.spotify_access_token}",
@@ -268,20 +280,41 @@ class SpotifyClient:
             }
 
             if self.spotify_refresh_token:
-                response = requests.get(
+                # Quota partagé par client_id: sans jeton (ou bloqué après un 429),
+                # servir le dernier état connu sans interroger Spotify
+                limiter = get_rate_limiter()
+                if not limiter.try_acquire(self.spotify_client_id):
+                    self.throttled = True
+                    return self._last_spotify_result
+
+                response = await get_http_client().get(
                     "https://api.spotify.com/v1/me/player/currently-playing",
                     headers=headers,
-                    timeout=3,
                 )
 
+                if response.status_code == 429:
+                    seconds = limiter.block(
+                        self.spotify_client_id, response.headers.get("Retry-After")
+                    )
+                    logging.warning(
+                        f"⏳ Spotify 429: client_id bloqué {seconds:.0f}s (Retry-After)"
+                    )
+                    self.throttled = True
+                    return self._last_spotify_result
+
                 if response.status_code == 200:
                     data = response.json()
                     if data and data.get("item"):
                         track = data["item"]
                         image_url = None
+                        analysis_image_url = None
                         if track.get("album", {}).get("images"):
                             images = track["album"]["images"]
                             image_url = images[0]["url"]
+                            # Chemin rapide: analyse sur une pochette réduite;
+                            # sinon la pochette pleine taille (image_url)
+                            if FAST_THUMBNAILS:
+                                analysis_image_url = pick_analysis_image(images)
 
                         track_info = {
                             "id": track["id"],
@@ -294,6 +327,7 @@ class SpotifyClient:
                             "progress_ms": data.get("progress_ms", 0),
                             "is_playing": data.get("is_playing", False),
                             "image_url": image_url,
+                            "analysis_image_url": analysis_image_url,
                             "timestamp": time.time(),
                         }
                         self.spotify_api_errors = 0
@@ -321,7 +355,11 @@ class SpotifyClient:
             self._last_spotify_result = None
             return None
 
-    def exchange_code_for_tokens(self, authorization_code):
+    def throttle_wait(self) -> float:
+        """Secondes avant que ce client_id puisse de nouveau interroger Spotify."""
+        return get_rate_limiter().wait_time(self.spotify_client_id)
+
+    async def exchange_code_for_tokens(self, authorization_code):
         try:
             auth_string = f"{self.spotify_client_id}:{self.spotify_client_secret}"
             auth_bytes = auth_string.encode("utf-8")
@@ -338,7 +376,7 @@ class SpotifyClient:
                 "redirect_uri": self.redirect_uri,
             }
 
-            response = requests.post(url, headers=headers, data=data, timeout=10)
+            response = await get_http_client().post(url, headers=headers, data=data)
 
             if response.status_code == 200:
                 token_data = response.json()
@@ -374,10 +412,10 @@ class SpotifyClient:
         }
         return f"https://accounts.spotify.com/authorize?{urlencode(params)}"
 
-    def handle_callback(self, code: str) -> bool:
+    async def handle_callback(self, code: str) -> bool:
         if not code:
             return False
-        return self.exchange_code_for_tokens(code)
+        return await self.exchange_code_for_tokens(code)
 
     def is_authenticated(self) -> bool:
         if not self.spotify_enabled:
@@ -5,14 +5,67 @@ Extracteur de couleurs Spotify - Combine client Spotify et extraction de couleur
 
 import time
 import os
+import asyncio
 import logging
 import threading
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
 from .spotify_client_service import SpotifyClient
 from .color_extractor_service import ColorExtractor
+from .color_cache import get_color_cache
+from .track_color_store import get_track_color_store
+from .http_client import close_http_clients
+from app.utils.executor import run_blocking
+
+
+@dataclass(frozen=True)
+class TrackSnapshot:
+    """État publié par le poller, lu tel quel par les routes publiques."""
+
+    track: Optional[dict]
+    # Couleur de la pochette (None si pause / rien en lecture)
+    color: Optional[Tuple[int, int, int]]
+    is_playing: bool
+    fetched_at: float
+
+    def age_ms(self, now: Optional[float] = None) -> int:
+        return max(0, int(((now or time.time()) - self.fetched_at) * 1000))
+
+
+# Écart toléré entre la position extrapolée et la position lue (saut dans la piste)
+_SEEK_TOLERANCE_MS = 2000
+
+
+def _snapshot_changed(
+    previous: Optional[TrackSnapshot], current: TrackSnapshot
+) -> bool:
+    """Changement visible par un spectateur: piste, lecture/pause, couleur ou seek."""
+    if previous is None:
+        return True
+    prev_track = previous.track or {}
+    track = current.track or {}
+    if (
+        prev_track.get("id") != track.get("id")
+        or previous.is_playing != current.is_playing
+        or previous.color != current.color
+    ):
+        return True
+    prev_progress, progress = prev_track.get("progress_ms"), track.get("progress_ms")
+    if prev_progress is None or progress is None:
+        return False
+    expected = prev_progress
+    if current.is_playing:
+        expected += (current.fetched_at - previous.fetched_at) * 1000
+    return abs(progress - expected) > _SEEK_TOLERANCE_MS
+
+
+def _analysis_image_url(track_info: dict) -> Optional[str]:
+    # Pochette réduite dédiée à l'analyse, sinon la grande (réponse ancienne)
+    return track_info.get("analysis_image_url") or track_info.get("image_url")
 
 
 class SpotifyColorExtractor:
-    def __init__(self, data_dir: str | None = None):
+    def __init__(self, data_dir: str | None = None, start_thread: bool = True):
         self.spotify_client = SpotifyClient()
         self.color_extractor = ColorExtractor()
 
@@ -27,12 +80,42 @@ class SpotifyColorExtractor:
         self.monitoring_thread = None
         self.spotify_check_interval = 1
         self.last_spotify_check = 0
+        # Politique de poll adaptative (voir _plan_next_poll)
+        self.poll_max_playing_interval = float(
+            os.getenv("SPOTIFY_POLL_MAX_PLAYING_SECONDS", "10")
+        )
+        self.poll_max_idle_interval = float(
+            os.getenv("SPOTIFY_POLL_MAX_IDLE_SECONDS", "60")
+        )
+        self.poll_delay = float(self.spotify_check_interval)
+        self._idle_polls = 0
+        # État du dernier poll (détection changement de piste / lecture)
+        self._last_track_id = None
+        self._last_is_playing = None
+        # Dernier état publié (remplacé atomiquement à chaque poll)
+        self.snapshot: Optional[TrackSnapshot] = None
+        # Appelé à chaque changement de snapshot (branché par AppState)
+        self.on_change: Optional[Callable[[TrackSnapshot], None]] = None
+        # Configuration utilisateur appliquée (gérée par AppState)
+        self.config_version: Optional[int] = None
+        self.config_loaded_at = 0.0
+        self.config_signature = None
 
-        self.stats = {"requests": 0, "cache_hits": 0, "extractions": 0, "errors": 0}
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "extractions": 0,
+            "errors": 0,
+            "polls": 0,
+            "polls_playing": 0,
+            "throttled": 0,
+        }
         self.verbose_logs = os.getenv("VERBOSE_SPOTIFY_LOGS", "false").lower() == "true"
         # Couleur de secours par défaut (peut être remplacée par utilisateur)
         self.default_fallback_rgb = (0x25, 0xD8, 0x65)  # #25d865
-        self.start_monitoring()
+        # Sans thread dédié, les polls sont pilotés par le SpotifyPoller central
+        if start_thread:
+            self.start_monitoring()
 
     def set_default_fallback_hex(self, hex_color: str | None):
         try:
@@ -62,78 +145,197 @@ class SpotifyColorExtractor:
         if self.verbose_logs:
             logging.info("⚡ Surveillance active - Logs réduits")
 
+    def stop_monitoring(self):
+        """Arrêter la surveillance et libérer les caches (client HTTP partagé)."""
+        self.monitoring_enabled = False
+        self.color_cache.clear()
+
     def _monitoring_loop(self):
-        last_track_id = None
-        last_is_playing = None
-        while self.monitoring_enabled:
+        # Thread historique: boucle d'événements privée pour les appels HTTP async
+        loop = asyncio.new_event_loop()
+        try:
+            while self.monitoring_enabled:
+                try:
+                    current_time = time.time()
+                    if (
+                        self.spotify_client.spotify_enabled
+                        and current_time - self.last_spotify_check
+                        >= self.poll_delay
+                    ):
+                        loop.run_until_complete(self.poll_once())
+                    time.sleep(1)
+                except Exception as e:
+                    logging.error(f"❌ Erreur monitoring: {e}")
+                    time.sleep(10)
+        finally:
+            loop.run_until_complete(close_http_clients())
+            loop.close()
+
+    async def poll_once(self):
+        """Effectuer une interrogation Spotify et appliquer le résultat.
+
+        Appelé par le planificateur central (SpotifyPoller) ou par le thread
+        de surveillance historique.
+        """
+        if not self.monitoring_enabled or not self.spotify_client.spotify_enabled:
+            # Non configuré: espacer les vérifications comme en pause
+            self._plan_next_poll(None)
+            return
+        track_info = await self.spotify_client.get_current_track()
+        if self.spotify_client.throttled:
+            # Limité (quota du client_id ou 429): garder le dernier snapshot
+            # et ne revenir qu'à la levée du blocage
+            self.stats["throttled"] += 1
+            self.poll_delay = max(
+                float(self.spotify_check_interval), self.spotify_client.throttle_wait()
+            )
+            return
+        self.last_spotify_check = time.time()
+        self.stats["polls"] += 1
+        await self._apply_track_info(track_info)
+        await self._publish_snapshot(track_info)
+        self._plan_next_poll(track_info)
+
+    def _plan_next_poll(self, track_info) -> None:
+        """Calcule poll_delay, le délai avant le prochain poll.
+
+        - en lecture: à la fin prévue de la piste (progress_ms / duration_ms),
+          au plus poll_max_playing_interval pour voir passer un saut de piste
+        - en pause, rien en lecture (204) ou erreur: recul exponentiel depuis
+          spotify_check_interval jusqu'à poll_max_idle_interval
+        """
+        fast = max(0.1, float(self.spotify_check_interval))
+        if track_info and track_info.get("is_playing", False):
+            self._idle_polls = 0
+            self.stats["polls_playing"] += 1
+            delay = self.poll_max_playing_interval
+            duration = track_info.get("duration_ms")
+            progress = track_info.get("progress_ms")
+            if duration and progress is not None:
+                delay = min(delay, max(0, duration - progress) / 1000)
+            self.poll_delay = max(fast, delay)
+            return
+        self._idle_polls += 1
+        self.poll_delay = min(
+            max(fast, self.poll_max_idle_interval),
+            fast * (2 ** min(self._idle_polls, 16)),
+        )
+
+    def reset_poll_backoff(self) -> None:
+        """Revenir au poll rapide (un spectateur vient d'arriver)."""
+        self._idle_polls = 0
+        self.poll_delay = max(0.1, float(self.spotify_check_interval))
+
+    async def _publish_snapshot(self, track_info):
+        is_playing = bool(track_info and track_info.get("is_playing", False))
+        color = None
+        if is_playing and track_info.get("id"):
+            # Couleur déjà calculée pour cette piste, sinon extraction
+            color = self.color_cache.get(f"color_{self.current_track_id}")
+            if color is None:
+                color = await self.extract_color()
+        previous = self.snapshot
+        snapshot = TrackSnapshot(
+            track=dict(track_info) if track_info else None,
+            color=color,
+            is_playing=is_playing,
+            fetched_at=self.last_spotify_check,
+        )
+        self.snapshot = snapshot
+        if self.on_change is not None and _snapshot_changed(previous, snapshot):
             try:
-                current_time = time.time()
-                if (
-                    self.spotify_client.spotify_enabled
-                    and current_time - self.last_spotify_check
-                    >= self.spotify_check_interval
-                ):
-                    track_info = self.spotify_client.get_current_track()
-                    self.last_spotify_check = current_time
-                    if track_info:
-                        current_track_id = track_info.get("id")
-                        current_is_playing = track_info.get("is_playing", False)
-                        track_changed = (last_track_id != current_track_id) and bool(
-                            current_track_id
-                        )
-                        playstate_changed = last_is_playing != current_is_playing
-                        if track_changed:
-                            if self.verbose_logs:
-                                logging.info(
-                                    f"🎵 {track_info.get('artist', 'Unknown')} - {track_info.get('name', 'Unknown')}"
-                                )
-                            self.current_track_image_url = track_info.get("image_url")
-                            self.current_track_id = current_track_id
-                            self.color_cache.clear()
-                            if current_is_playing:
-                                new_color = self.extract_color()
-                                if self.verbose_logs:
-                                    logging.info(
-                                        f"🎨 #{new_color[0]:02x}{new_color[1]:02x}{new_color[2]:02x}"
-                                    )
-                            last_track_id = current_track_id
-                            last_is_playing = current_is_playing
-                        elif playstate_changed:
-                            if current_is_playing:
-                                if self.verbose_logs:
-                                    logging.info(
-                                        f"▶️ {track_info.get('artist', 'Unknown')} - {track_info.get('name', 'Unknown')}"
-                                    )
-                                if self.current_track_id != current_track_id:
-                                    self.current_track_image_url = track_info.get(
-                                        "image_url"
-                                    )
-                                    self.current_track_id = current_track_id
-                                    self.color_cache.clear()
-                                new_color = self.extract_color()
-                                if self.verbose_logs:
-                                    logging.info(
-                                        f"🎨 #{new_color[0]:02x}{new_color[1]:02x}{new_color[2]:02x}"
-                                    )
-                            else:
-                                if self.verbose_logs:
-                                    logging.info("⏸️ PAUSE")
-                            last_is_playing = current_is_playing
-                    else:
-                        if last_track_id is not None or last_is_playing is not None:
-                            if self.verbose_logs:
-                                logging.info("🔇 STOP")
-                            last_track_id = None
-                            last_is_playing = None
-                time.sleep(1)
+                self.on_change(snapshot)
             except Exception as e:
-                logging.error(f"❌ Erreur monitoring: {e}")
-                time.sleep(10)
+                logging.error(f"❌ Erreur publication changement: {e}")
+
+    def get_snapshot(self) -> Optional[TrackSnapshot]:
+        return self.snapshot
+
+    def build_update_event(
+        self, user_id: str, snapshot: Optional[TrackSnapshot]
+    ) -> dict:
+        """Message « track_update » poussé aux abonnés temps réel.
+
+        progress_ms est mesuré à fetched_at: le client extrapole la position
+        (progress_ms + maintenant - fetched_at) tant que is_playing est vrai.
+        """
+        r, g, b = self.snapshot_color(snapshot)
+        track = snapshot.track if snapshot and snapshot.track else None
+        return {
+            "type": "track_update",
+            "user": user_id,
+            "is_playing": bool(snapshot and snapshot.is_playing),
+            "color": {"r": r, "g": g, "b": b, "hex": f"#{r:02x}{g:02x}{b:02x}"},
+            "track": dict(track)
+            if track
+            else {"id": None, "name": "No music playing", "is_playing": False},
+            "progress_ms": track.get("progress_ms") if track else None,
+            "duration_ms": track.get("duration_ms") if track else None,
+            "fetched_at": snapshot.fetched_at if snapshot else None,
+        }
+
+    def snapshot_color(self, snapshot: Optional[TrackSnapshot]):
+        """Couleur à afficher pour un snapshot (secours si pause ou inconnu)."""
+        if snapshot is not None and snapshot.is_playing and snapshot.color:
+            return snapshot.color
+        return self._get_fallback_color()
 
-    def extract_color(self):
+    async def _apply_track_info(self, track_info):
+        last_track_id = self._last_track_id
+        last_is_playing = self._last_is_playing
+        if track_info:
+            current_track_id = track_info.get("id")
+            current_is_playing = track_info.get("is_playing", False)
+            track_changed = (last_track_id != current_track_id) and bool(
+                current_track_id
+            )
+            playstate_changed = last_is_playing != current_is_playing
+            if track_changed:
+                if self.verbose_logs:
+                    logging.info(
+                        f"🎵 {track_info.get('artist', 'Unknown')} - {track_info.get('name', 'Unknown')}"
+                    )
+                self.current_track_image_url = _analysis_image_url(track_info)
+                self.current_track_id = current_track_id
+                self.color_cache.clear()
+                if current_is_playing:
+                    new_color = await self.extract_color()
+                    if self.verbose_logs:
+                        logging.info(
+                            f"🎨 #{new_color[0]:02x}{new_color[1]:02x}{new_color[2]:02x}"
+                        )
+                self._last_track_id = current_track_id
+                self._last_is_playing = current_is_playing
+            elif playstate_changed:
+                if current_is_playing:
+                    if self.verbose_logs:
+                        logging.info(
+                            f"▶️ {track_info.get('artist', 'Unknown')} - {track_info.get('name', 'Unknown')}"
+                        )
+                    if self.current_track_id != current_track_id:
+                        self.current_track_image_url = _analysis_image_url(track_info)
+                        self.current_track_id = current_track_id
+                        self.color_cache.clear()
+                    new_color = await self.extract_color()
+                    if self.verbose_logs:
+                        logging.info(
+                            f"🎨 #{new_color[0]:02x}{new_color[1]:02x}{new_color[2]:02x}"
+                        )
+                else:
+                    if self.verbose_logs:
+                        logging.info("⏸️ PAUSE")
+                self._last_is_playing = current_is_playing
+        else:
+            if last_track_id is not None or last_is_playing is not None:
+                if self.verbose_logs:
+                    logging.info("🔇 STOP")
+                self._last_track_id = None
+                self._last_is_playing = None
+
+    async def extract_color(self):
         current_time = time.time()
         self.stats["requests"] += 1
-        track_info = self.spotify_client.get_current_track()
+        track_info = await self.spotify_client.get_current_track()
         # Si pas de piste ou en pause => couleur de secours (toujours actualisée via state)
         if not track_info or not track_info.get("is_playing", False):
             return self._get_fallback_color()
@@ -146,20 +348,24 @@ class SpotifyColorExtractor:
             self.stats["cache_hits"] += 1
             return self.color_cache[cache_key]
 
-        self.stats["extractions"] += 1
         try:
             if not self.current_track_image_url:
-                if track_info and track_info.get("image_url"):
-                    self.current_track_image_url = track_info["image_url"]
+                if track_info and _analysis_image_url(track_info):
+                    self.current_track_image_url = _analysis_image_url(track_info)
                     self.current_track_id = track_info.get("id")
                 else:
                     return self._get_fallback_color()
             if not self.current_track_image_url:
                 return self._get_fallback_color()
-            image = self.color_extractor.download_image(self.current_track_image_url)
-            if not image:
+            # Pochette déjà analysée (ou en cours d'analyse) par ce processus:
+            # un seul téléchargement pour tous les utilisateurs concernés
+            image_url = self.current_track_image_url
+            track_id = self.current_track_id
+            color = await get_color_cache().get_or_compute(
+                image_url, lambda: self._download_and_extract(image_url, track_id)
+            )
+            if color is None:
                 return self._get_fallback_color()
-            color = self.color_extractor.extract_primary_color(image)
             if self.current_track_id:
                 cache_key = f"color_{self.current_track_id}"
                 self.color_cache[cache_key] = color
@@ -170,18 +376,30 @@ class SpotifyColorExtractor:
             logging.error(f"❌ Erreur extraction couleur: {e}")
             return self._get_fallback_color()
 
+    async def _download_and_extract(self, image_url, track_id=None):
+        # Couleur déjà persistée (redémarrage, autre worker): pas de téléchargement
+        store = get_track_color_store()
+        color = await run_blocking(store.lookup, image_url)
+        if color is not None:
+            return color
+        self.stats["extractions"] += 1
+        color = await self.color_extractor.extract_color_from_url(image_url)
+        if color is not None:
+            await run_blocking(store.record, image_url, track_id, color)
+        return color
+
     def _get_fallback_color(self):
         # Utiliser la couleur par défaut (paramétrable par utilisateur)
         return self.default_fallback_rgb
 
-    def get_current_track_info(self):
-        return self.spotify_client.get_current_track()
+    async def get_current_track_info(self):
+        return await self.spotify_client.get_current_track()
 
     def get_stats(self):
         return self.stats
 
-    def exchange_code_for_tokens(self, authorization_code):
-        return self.spotify_client.exchange_code_for_tokens(authorization_code)
+    async def exchange_code_for_tokens(self, authorization_code):
+        return await self.spotify_client.exchange_code_for_tokens(authorization_code)
 
     @property
     def spotify_client_id(self):
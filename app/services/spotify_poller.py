@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Planificateur Spotify central - Un seul service interroge Spotify pour tous les utilisateurs
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .spotify_color_extractor_service import SpotifyColorExtractor
+
+
+class SpotifyPoller:
+    """File de priorité (échéance du prochain poll) + concurrence bornée.
+
+    Remplace le thread de surveillance par utilisateur: les polls sont des
+    coroutines sur la boucle principale (client HTTP async partagé), au plus
+    SPOTIFY_POLL_CONCURRENCY en vol quel que soit le nombre d'utilisateurs.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None) -> None:
+        self.max_concurrency = max(
+            1, int(max_concurrency or os.getenv("SPOTIFY_POLL_CONCURRENCY", "16"))
+        )
+        self._extractors: Dict[str, SpotifyColorExtractor] = {}
+        # (échéance monotonic, séquence, user_id)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        # Échéance valide par utilisateur: une entrée du tas qui ne correspond
+        # plus (poll avancé par poke) est ignorée à son échéance
+        self._due: Dict[str, float] = {}
+        # Utilisateurs en cours de poll
+        self._polling: Set[str] = set()
+        # Utilisateurs sans spectateur, plus replanifiés: user_id -> (depuis, délai)
+        self._hibernated: Dict[str, Tuple[float, float]] = {}
+        # Demande: l'utilisateur a-t-il des spectateurs ? (fourni par AppState)
+        self.is_watched: Callable[[str], bool] = lambda user_id: True
+        # Les routes synchrones tournent dans des threads: protéger l'état partagé
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._inflight: Set[asyncio.Task] = set()
+
+        self.stats = {
+            "polls": 0,
+            "errors": 0,
+            "max_lag_ms": 0,
+            "pokes": 0,
+            "hibernations": 0,
+            "resumes": 0,
+            "polls_saved": 0,
+        }
+
+    # --- Cycle de vie -----------------------------------------------------
+    async def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        # Drapeau en plus de cancel(): wait_for peut absorber une annulation
+        # qui coïncide avec le réveil (Python 3.11)
+        self._running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    # --- Enregistrement ---------------------------------------------------
+    def register(self, user_id: str, extractor: SpotifyColorExtractor) -> None:
+        """Ajouter (ou remplacer) l'extracteur d'un utilisateur; poll immédiat."""
+        with self._lock:
+            self._extractors[user_id] = extractor
+            if user_id not in self._due and user_id not in self._polling:
+                self._push(user_id, time.monotonic())
+        self._notify()
+
+    def poke(self, user_id: str) -> None:
+        """Un spectateur arrive: annuler le recul et interroger Spotify tout de suite.
+
+        Réveille aussi un utilisateur en hibernation.
+        """
+        with self._lock:
+            extractor = self._extractors.get(user_id)
+            if extractor is None:
+                return
+            self._resume(user_id, time.monotonic())
+            extractor.reset_poll_backoff()
+            if user_id in self._polling:
+                # Le prochain délai, calculé après ce poll, sera court
+                return
+            now = time.monotonic()
+            due = self._due.get(user_id)
+            if due is not None and due <= now:
+                return
+            self._push(user_id, now)
+            self.stats["pokes"] += 1
+        self._notify()
+
+    def unregister(self, user_id: str) -> None:
+        """Retirer un utilisateur; l'entrée du tas est ignorée à son échéance."""
+        with self._lock:
+            self._extractors.pop(user_id, None)
+            self._due.pop(user_id, None)
+            self._hibernated.pop(user_id, None)
+
+    def is_hibernated(self, user_id: str) -> bool:
+        return user_id in self._hibernated
+
+    def __len__(self) -> int:
+        return len(self._extractors)
+
+    def get_stats(self, top: int = 10) -> dict:
+        with self._lock:
+            scheduled = len(self._due)
+            hibernated = len(self._hibernated)
+            extractors = list(self._extractors.items())
+        # Utilisateurs les plus interrogés (quota Spotify consommé)
+        busiest = sorted(
+            extractors, key=lambda item: item[1].stats.get("polls", 0), reverse=True
+        )[:top]
+        return {
+            **self.stats,
+            "users": len(extractors),
+            "scheduled": scheduled,
+            "hibernated": hibernated,
+            "in_flight": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "top_users": [
+                {
+                    "user_id": uid,
+                    "polls": ex.stats.get("polls", 0),
+                    "polls_playing": ex.stats.get("polls_playing", 0),
+                    "next_delay_s": round(ex.poll_delay, 2),
+                }
+                for uid, ex in busiest
+            ],
+        }
+
+    # --- Interne ----------------------------------------------------------
+    def _push(self, user_id: str, due: float) -> None:
+        # Appelé sous self._lock
+        heapq.heappush(self._heap, (due, next(self._seq), user_id))
+        self._due[user_id] = due
+
+    def _resume(self, user_id: str, now: float) -> None:
+        # Appelé sous self._lock
+        entry = self._hibernated.pop(user_id, None)
+        if entry is None:
+            return
+        since, delay = entry
+        # Polls évités pendant l'hibernation, au rythme qui aurait été suivi
+        self.stats["polls_saved"] += int((now - since) / max(0.1, delay))
+        self.stats["resumes"] += 1
+
+    def _notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # Boucle en cours d'arrêt
+            pass
+
+    def _pop_due(self, now: float) -> Tuple[List[str], Optional[float]]:
+        due: List[str] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, user_id = heapq.heappop(self._heap)
+                if self._due.get(user_id) != deadline:
+                    # Entrée remplacée (poke) ou utilisateur retiré
+                    continue
+                del self._due[user_id]
+                if user_id not in self._extractors:
+                    continue
+                self._polling.add(user_id)
+                lag_ms = int((now - deadline) * 1000)
+                if lag_ms > self.stats["max_lag_ms"]:
+                    self.stats["max_lag_ms"] = lag_ms
+                due.append(user_id)
+            next_due = self._heap[0][0] if self._heap else None
+        return due, next_due
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._semaphore is not None
+        while self._running:
+            self._wakeup.clear()
+            due, next_due = self._pop_due(time.monotonic())
+            for user_id in due:
+                # Contre-pression: ne pas lancer plus de polls que la limite
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._poll(user_id))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+            if due:
+                # Des entrées ont pu échoir pendant l'attente du sémaphore
+                continue
+            timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, user_id: str) -> None:
+        assert self._semaphore is not None and self._wakeup is not None
+        extractor = self._extractors.get(user_id)
+        try:
+            if extractor is not None and extractor.monitoring_enabled:
+                await extractor.poll_once()
+                self.stats["polls"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"❌ Erreur poll Spotify ({user_id}): {e}")
+        finally:
+            self._semaphore.release()
+            # Hors verrou: consulte l'état des spectateurs (AppState, WebSocket)
+            try:
+                watched = self.is_watched(user_id)
+            except Exception:
+                watched = True
+            with self._lock:
+                self._polling.discard(user_id)
+                current = self._extractors.get(user_id)
+                if current is not None and user_id not in self._due:
+                    now = time.monotonic()
+                    if watched:
+                        # Délai adaptatif calculé par l'extracteur après ce poll
+                        self._push(user_id, now + current.poll_delay)
+                    else:
+                        # Personne ne regarde: plus de poll jusqu'au prochain poke
+                        self._hibernated[user_id] = (now, current.poll_delay)
+                        self.stats["hibernations"] += 1
+            self._wakeup.set()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Limiteur de débit Spotify - Seau à jetons par client_id et respect de Retry-After (429)
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Retry-After en secondes (entier ou date HTTP); `default` si absent/illisible."""
+    if not value:
+        return default
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+class SpotifyRateLimiter:
+    """Un seau par client_id: toutes les applications Spotify partagées par
+    plusieurs utilisateurs consomment le même quota.
+
+    Après un 429, la clé est bloquée jusqu'à l'expiration de Retry-After:
+    aucun poller ne l'interroge, les extracteurs servent le dernier état connu.
+    """
+
+    def __init__(
+        self, rate_per_second: Optional[float] = None, burst: Optional[float] = None
+    ) -> None:
+        self.rate = max(
+            0.01,
+            float(
+                rate_per_second
+                if rate_per_second is not None
+                else os.getenv("SPOTIFY_RATE_PER_SECOND", "10")
+            ),
+        )
+        self.burst = max(
+            1.0,
+            float(burst if burst is not None else os.getenv("SPOTIFY_RATE_BURST", "30")),
+        )
+        self.default_retry_after = float(
+            os.getenv("SPOTIFY_RETRY_AFTER_DEFAULT_SECONDS", "5")
+        )
+        # client_id -> (jetons, dernier remplissage monotonic)
+        self._buckets: Dict[str, List[float]] = {}
+        # client_id -> fin du blocage (monotonic)
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"throttle_events": 0, "rejected": 0, "acquired": 0}
+
+    def try_acquire(self, key: Optional[str]) -> bool:
+        """Consommer un jeton pour `key`; False si bloquée ou seau vide."""
+        if not key:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self._blocked_until.get(key, 0.0) > now:
+                self.stats["rejected"] += 1
+                return False
+            self._blocked_until.pop(key, None)
+            bucket = self._refill(key, now)
+            if bucket[0] < 1.0:
+                self.stats["rejected"] += 1
+                return False
+            bucket[0] -= 1.0
+            self.stats["acquired"] += 1
+            return True
+
+    def wait_time(self, key: Optional[str]) -> float:
+        """Secondes avant qu'une requête sur `key` soit de nouveau permise."""
+        if not key:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            blocked = self._blocked_until.get(key, 0.0) - now
+            if blocked > 0:
+                return blocked
+            tokens = self._refill(key, now)[0]
+            return 0.0 if tokens >= 1.0 else (1.0 - tokens) / self.rate
+
+    def block(self, key: Optional[str], retry_after: Optional[str]) -> float:
+        """Bloquer `key` après un 429; renvoie la durée du blocage en secondes."""
+        seconds = parse_retry_after(retry_after, self.default_retry_after)
+        if not key:
+            return seconds
+        until = time.monotonic() + seconds
+        with self._lock:
+            if until > self._blocked_until.get(key, 0.0):
+                self._blocked_until[key] = until
+            # Le quota est épuisé côté Spotify: vider le seau local
+            self._refill(key, time.monotonic())[0] = 0.0
+            self.stats["throttle_events"] += 1
+        return seconds
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            blocked = {
+                key[:8]: round(until - now, 1)
+                for key, until in self._blocked_until.items()
+                if until > now
+            }
+            keys = len(self._buckets)
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "client_ids": keys,
+            # Préfixe du client_id uniquement -> secondes de blocage restantes
+            "blocked": blocked,
+            **self.stats,
+        }
+
+    def _refill(self, key: str, now: float) -> List[float]:
+        # Appelé sous self._lock
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            return bucket
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        return bucket
+
+
+_LIMITER: Optional[SpotifyRateLimiter] = None
+
+
+def get_rate_limiter() -> SpotifyRateLimiter:
+    global _LIMITER
+    if _LIMITER is None:
+        _LIMITER = SpotifyRateLimiter()
+    return _LIMITER
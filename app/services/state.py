@@ -1,39 +1,328 @@
-from typing import Optional, Dict
+import os
+import time
+import asyncio
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Set
 from sqlalchemy.orm import Session
 from app.services.spotify_color_extractor_service import SpotifyColorExtractor
+from app.services.spotify_poller import SpotifyPoller
+from app.services.realtime import get_manager
+from app.services.track_color_store import get_track_color_store, track_color_flusher
 from app.models.user import SpotifySecret, SpotifyToken, User
 import app.utils.encryption as enc
 
 
+# Clé du planificateur pour l'extracteur global (hors utilisateur)
+_GLOBAL_EXTRACTOR_KEY = "__global__"
+
+
 class AppState:
     def __init__(self) -> None:
         self.extractor: Optional[SpotifyColorExtractor] = None
         self.user_extractors: Dict[str, SpotifyColorExtractor] = {}
+        # Un seul planificateur interroge Spotify pour tous les extracteurs
+        self.poller = SpotifyPoller()
+        # Registre LRU: user_id -> dernier accès (monotonic), du plus ancien au plus récent
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._registry_lock = threading.RLock()
+        self.extractor_idle_ttl = float(
+            os.getenv("EXTRACTOR_IDLE_TTL_SECONDS", "900")
+        )
+        self.extractor_max_entries = max(
+            1, int(os.getenv("EXTRACTOR_MAX_ENTRIES", "5000"))
+        )
+        self.extractor_sweep_interval = float(
+            os.getenv("EXTRACTOR_SWEEP_INTERVAL_SECONDS", "60")
+        )
+        self.eviction_stats = {"evicted_idle": 0, "evicted_capacity": 0}
+        # Version de config par utilisateur, incrémentée par les routes d'écriture
+        self._config_versions: Dict[str, int] = {}
+        # Filet de sécurité multi-workers: rechargement périodique malgré tout
+        self.user_config_ttl = float(os.getenv("USER_CONFIG_TTL_SECONDS", "300"))
+        self.config_stats = {"hits": 0, "loads": 0}
+        # Dernière requête publique par utilisateur (arrivée de spectateurs)
+        self._last_viewer: Dict[str, float] = {}
+        self.viewer_reconnect_seconds = float(
+            os.getenv("SPOTIFY_VIEWER_RECONNECT_SECONDS", "30")
+        )
+        # Sans requête publique ni abonné WS depuis ce délai: hibernation du poll
+        self.watch_grace_seconds = float(
+            os.getenv("SPOTIFY_WATCH_GRACE_SECONDS", "120")
+        )
+        self.poller.is_watched = self.is_watched
+        # Boucle principale: les changements de piste y sont publiés aux WebSockets
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pushes: Set["asyncio.Future"] = set()
+        self.push_stats = {"updates": 0, "skipped_no_subscriber": 0}
+        self._sweeper_stop: Optional[asyncio.Event] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._flusher_task: Optional[asyncio.Task] = None
 
     async def start(self):
         # Ne pas initialiser d'extracteur global: chaque utilisateur a le sien
-        return None
+        self._loop = asyncio.get_running_loop()
+        await self.poller.start()
+        self._sweeper_stop = asyncio.Event()
+        self._sweeper_task = asyncio.create_task(self._sweeper(self._sweeper_stop))
+        # Écriture différée des couleurs extraites (même signal d'arrêt)
+        self._flusher_task = asyncio.create_task(
+            track_color_flusher(get_track_color_store(), self._sweeper_stop)
+        )
 
     async def stop(self):
-        # Rien de spécial pour l'instant
-        return None
+        if self._sweeper_stop is not None:
+            self._sweeper_stop.set()
+        for task in (self._sweeper_task, self._flusher_task):
+            if task is None:
+                continue
+            try:
+                await task
+            except Exception:
+                pass
+        await self.poller.stop()
+        # Polls terminés: écrire les dernières couleurs en attente
+        try:
+            get_track_color_store().flush()
+        except Exception:
+            pass
+
+    async def _sweeper(self, stop_event: asyncio.Event) -> None:
+        """Tâche de fond: évince les extracteurs inactifs depuis plus du TTL."""
+        while True:
+            try:
+                n = self.evict_idle_extractors()
+                if n:
+                    logging.info("Extracteurs inactifs évincés: %d", n)
+            except Exception:
+                logging.exception("extractor sweeper: exception inattendue")
+            try:
+                await asyncio.wait_for(
+                    stop_event.wait(), timeout=self.extractor_sweep_interval
+                )
+                break
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                break
+
+    def evict_idle_extractors(self, now: Optional[float] = None) -> int:
+        """Évince les extracteurs non consultés depuis extractor_idle_ttl secondes."""
+        now = now if now is not None else time.monotonic()
+        cutoff = now - self.extractor_idle_ttl
+        evicted = 0
+        manager = get_manager()
+        with self._registry_lock:
+            # OrderedDict trié par dernier accès: s'arrêter au premier récent
+            while self._last_access:
+                user_id, last = next(iter(self._last_access.items()))
+                if last > cutoff:
+                    break
+                if manager.has_subscribers(user_id):
+                    # Abonnés WebSocket: ils ne refont pas de requête, l'accès
+                    # compte comme récent tant que la socket est ouverte
+                    self._last_access[user_id] = now
+                    self._last_access.move_to_end(user_id)
+                    continue
+                self._evict(user_id)
+                self.eviction_stats["evicted_idle"] += 1
+                evicted += 1
+        return evicted
+
+    def _evict(self, user_id: str) -> None:
+        # Appelé sous self._registry_lock
+        self._last_access.pop(user_id, None)
+        self._last_viewer.pop(user_id, None)
+        extractor = self.user_extractors.pop(user_id, None)
+        self.poller.unregister(user_id)
+        if extractor is not None:
+            try:
+                extractor.stop_monitoring()
+            except Exception:
+                pass
+
+    def _touch(self, user_id: str) -> SpotifyColorExtractor:
+        """Récupère ou crée l'extracteur et met à jour son dernier accès."""
+        with self._registry_lock:
+            extractor = self.user_extractors.get(user_id)
+            if not extractor:
+                # Capacité max: évincer le moins récemment utilisé, jamais un
+                # utilisateur dont des sockets attendent encore des pushes
+                victims = (
+                    uid
+                    for uid in list(self._last_access)
+                    if not get_manager().has_subscribers(uid)
+                )
+                while len(self.user_extractors) >= self.extractor_max_entries:
+                    oldest = next(victims, None)
+                    if oldest is None:
+                        break
+                    self._evict(oldest)
+                    self.eviction_stats["evicted_capacity"] += 1
+                extractor = SpotifyColorExtractor(start_thread=False)
+                extractor.on_change = functools.partial(self._push_update, user_id)
+                self.user_extractors[user_id] = extractor
+                self.poller.register(user_id, extractor)
+            self._last_access[user_id] = time.monotonic()
+            self._last_access.move_to_end(user_id)
+            return extractor
+
+    def _push_update(self, user_id: str, snapshot) -> None:
+        """Pousse un changement de piste/couleur aux abonnés WebSocket.
+
+        Appelable depuis la boucle (poller) comme depuis un thread (thread de
+        surveillance historique): l'envoi est toujours planifié sur la boucle
+        principale, sans attendre.
+        """
+        manager = get_manager()
+        if not manager.has_subscribers(user_id):
+            self.push_stats["skipped_no_subscriber"] += 1
+            return
+        extractor = self.user_extractors.get(user_id)
+        loop = self._loop
+        if extractor is None or loop is None or loop.is_closed():
+            return
+        message = extractor.build_update_event(user_id, snapshot)
+        self.push_stats["updates"] += 1
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            future = loop.create_task(manager.broadcast(user_id, message))
+        else:
+            future = asyncio.run_coroutine_threadsafe(
+                manager.broadcast(user_id, message), loop
+            )
+        # Garder une référence jusqu'à la fin de l'envoi
+        self._pushes.add(future)
+        future.add_done_callback(self._pushes.discard)
+
+    def note_viewer(self, user_id: str, connected: bool = False) -> None:
+        """Signale un spectateur (requête publique ou WebSocket).
+
+        Une connexion, ou une requête après une absence de plus de
+        viewer_reconnect_seconds, ramène le poll au rythme rapide.
+        """
+        if not user_id:
+            return
+        now = time.monotonic()
+        with self._registry_lock:
+            last = self._last_viewer.get(user_id)
+            self._last_viewer[user_id] = now
+        if (
+            connected
+            or last is None
+            or now - last > self.viewer_reconnect_seconds
+            or self.poller.is_hibernated(user_id)
+        ):
+            self.poller.poke(user_id)
+
+    def is_watched(self, user_id: str, now: Optional[float] = None) -> bool:
+        """Requête publique récente ou abonné WebSocket connecté."""
+        if user_id == _GLOBAL_EXTRACTOR_KEY:
+            return True
+        with self._registry_lock:
+            last = self._last_viewer.get(user_id)
+        now = now if now is not None else time.monotonic()
+        if last is not None and now - last <= self.watch_grace_seconds:
+            return True
+        return get_manager().has_subscribers(user_id)
+
+    def get_demand_stats(self) -> dict:
+        now = time.monotonic()
+        with self._registry_lock:
+            users = list(self.user_extractors)
+        watched = sum(1 for uid in users if self.is_watched(uid, now))
+        return {
+            **self.push_stats,
+            "watched": watched,
+            "unwatched": len(users) - watched,
+            "grace_seconds": self.watch_grace_seconds,
+            "ws_subscribers": get_manager().subscriber_count(),
+        }
+
+    def get_stats(self) -> dict:
+        with self._registry_lock:
+            live = len(self.user_extractors)
+        return {
+            "live_extractors": live,
+            "max_entries": self.extractor_max_entries,
+            "idle_ttl_seconds": self.extractor_idle_ttl,
+            **self.eviction_stats,
+        }
 
     def get_extractor(self) -> SpotifyColorExtractor:
         if not self.extractor:
-            self.extractor = SpotifyColorExtractor()
+            self.extractor = SpotifyColorExtractor(start_thread=False)
+            self.poller.register(_GLOBAL_EXTRACTOR_KEY, self.extractor)
         return self.extractor
 
+    # --- Cache de configuration utilisateur --------------------------------
+    def invalidate_user_config(self, user_id: str) -> None:
+        """À appeler par les routes qui modifient réglages ou secrets Spotify."""
+        with self._registry_lock:
+            self._config_versions[user_id] = self._config_versions.get(user_id, 0) + 1
+
+    def _config_is_fresh(self, extractor: SpotifyColorExtractor, user_id: str) -> bool:
+        with self._registry_lock:
+            version = self._config_versions.get(user_id, 0)
+        return (
+            extractor.config_version == version
+            and time.monotonic() - extractor.config_loaded_at < self.user_config_ttl
+        )
+
+    def get_cached_extractor(self, user_id: str) -> Optional[SpotifyColorExtractor]:
+        """Extracteur dont la configuration est à jour, sans accès DB; sinon None."""
+        if not user_id:
+            return None
+        with self._registry_lock:
+            extractor = self.user_extractors.get(user_id)
+        if extractor is None or not self._config_is_fresh(extractor, user_id):
+            return None
+        self.config_stats["hits"] += 1
+        return self._touch(user_id)
+
     def get_extractor_for_user(
         self, user_id: str, db: Session
     ) -> SpotifyColorExtractor:
         if not user_id:
             return self.get_extractor()
         # Récupérer ou créer l'extracteur utilisateur
-        extractor = self.user_extractors.get(user_id)
-        if not extractor:
-            extractor = SpotifyColorExtractor()
-            self.user_extractors[user_id] = extractor
-        # Toujours rafraîchir la couleur de secours depuis la DB pour refléter immédiatement les changements
+        extractor = self._touch(user_id)
+        # Config inchangée depuis le dernier chargement: ni requête ni déchiffrement
+        if self._config_is_fresh(extractor, user_id):
+            self.config_stats["hits"] += 1
+            return extractor
+        # Lire la version avant le chargement: une invalidation concurrente forcera un rechargement
+        with self._registry_lock:
+            version = self._config_versions.get(user_id, 0)
+        self.config_stats["loads"] += 1
+        self._load_user_config(extractor, user_id, db)
+        extractor.config_version = version
+        extractor.config_loaded_at = time.monotonic()
+        return extractor
+
+    def get_extractor_for_known_user(
+        self, user_id: str, db: Session
+    ) -> Optional[SpotifyColorExtractor]:
+        """Comme get_extractor_for_user, mais None pour un identifiant inconnu.
+
+        Pour les routes anonymes: des identifiants arbitraires ne doivent ni
+        créer d'extracteur ni évincer (LRU) ceux des vrais utilisateurs.
+        """
+        if not user_id:
+            return None
+        if not db.query(User.id).filter(User.id == user_id).first():
+            return None
+        return self.get_extractor_for_user(user_id, db)
+
+    def _load_user_config(
+        self, extractor: SpotifyColorExtractor, user_id: str, db: Session
+    ) -> None:
+        # Couleur de secours depuis la DB
         try:
             from app.models.user import UserSetting
 
@@ -43,7 +332,7 @@ class AppState:
                 extractor.set_default_fallback_hex(default_hex)
         except Exception:
             pass
-        # Configurer/rafraîchir les secrets Spotify si présents (ne change rien si identiques)
+        # Configurer les secrets Spotify si présents et modifiés (évite un appel token inutile)
         try:
             secret = (
                 db.query(SpotifySecret).filter(SpotifySecret.user_id == user_id).first()
@@ -63,11 +352,15 @@ class AppState:
                     if (token and token.refresh_token)
                     else None
                 )
-                if cid and csec:
-                    extractor.spotify_client.configure_spotify_api(cid, csec, rtok)
+                signature = (cid, csec, rtok)
+                if cid and csec and signature != extractor.config_signature:
+                    if extractor.spotify_client.configure_spotify_api(cid, csec, rtok):
+                        extractor.config_signature = signature
         except Exception:
             pass
-        return extractor
+
+    def get_config_stats(self) -> dict:
+        return {"ttl_seconds": self.user_config_ttl, **self.config_stats}
 
 
 # Singleton global pour un accès simple depuis les routes
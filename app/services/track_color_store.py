@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Persistance des couleurs de pochettes - table api_track_colors (lecture directe, écriture différée)
+"""
+
+from __future__ import annotations
+
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.utils.database import SessionLocal
+from app.models.user import TrackColor
+from .color_extractor_service import COLOR_ALGORITHM_VERSION
+
+RGB = Tuple[int, int, int]
+
+
+def image_key(image_url: str) -> str:
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+
+
+class TrackColorStore:
+    """Couleurs extraites persistées pour démarrer à chaud après un redéploiement.
+
+    - lookup(): lecture directe en DB avant tout téléchargement
+    - record(): mise en file, insérée par lots (flush périodique ou lot plein)
+    Seules les lignes de la version d'algorithme courante sont servies.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("TRACK_COLOR_PERSIST", "true").lower() == "true"
+        self.batch_size = max(1, int(os.getenv("TRACK_COLOR_BATCH_SIZE", "50")))
+        self.flush_interval = float(os.getenv("TRACK_COLOR_FLUSH_SECONDS", "5"))
+        self.algo_version = COLOR_ALGORITHM_VERSION
+        # image_key -> ligne en attente d'écriture
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stats = {"lookups": 0, "db_hits": 0, "written": 0, "flushes": 0, "errors": 0}
+
+    def lookup(self, image_url: str) -> Optional[RGB]:
+        if not self.enabled or not image_url:
+            return None
+        key = image_key(image_url)
+        self.stats["lookups"] += 1
+        with self._lock:
+            row = self._pending.get(key)
+        if row is not None:
+            return (row["r"], row["g"], row["b"])
+        db = SessionLocal()
+        try:
+            tc = (
+                db.query(TrackColor)
+                .filter(
+                    TrackColor.image_key == key,
+                    TrackColor.algo_version == self.algo_version,
+                )
+                .first()
+            )
+            if tc is None:
+                return None
+            self.stats["db_hits"] += 1
+            return (tc.r, tc.g, tc.b)
+        except Exception:
+            self.stats["errors"] += 1
+            logging.exception("TrackColorStore: lecture impossible")
+            return None
+        finally:
+            db.close()
+
+    def record(self, image_url: str, track_id: Optional[str], color: RGB) -> None:
+        if not self.enabled or not image_url:
+            return
+        r, g, b = (int(v) for v in color)
+        with self._lock:
+            self._pending[image_key(image_url)] = {
+                "image_url": image_url[:512],
+                "track_id": track_id,
+                "r": r,
+                "g": g,
+                "b": b,
+            }
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Écrit les couleurs en attente en un seul commit (upsert par clé)."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            db = SessionLocal()
+            try:
+                existing = {
+                    tc.image_key: tc
+                    for tc in db.query(TrackColor)
+                    .filter(TrackColor.image_key.in_(list(batch)))
+                    .all()
+                }
+                now = datetime.utcnow()
+                for key, row in batch.items():
+                    tc = existing.get(key)
+                    if tc is None:
+                        db.add(
+                            TrackColor(
+                                image_key=key,
+                                algo_version=self.algo_version,
+                                created_at=now,
+                                **row,
+                            )
+                        )
+                        continue
+                    # Ligne d'une ancienne version d'algorithme: la remplacer
+                    for field, value in row.items():
+                        setattr(tc, field, value)
+                    tc.algo_version = self.algo_version
+                    tc.created_at = now
+                db.commit()
+                self.stats["written"] += len(batch)
+                self.stats["flushes"] += 1
+                return len(batch)
+            except Exception:
+                db.rollback()
+                self.stats["errors"] += 1
+                logging.exception("TrackColorStore: écriture du lot impossible")
+                return 0
+            finally:
+                db.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "algo_version": self.algo_version,
+            "pending": pending,
+            **self.stats,
+        }
+
+
+async def track_color_flusher(
+    store: TrackColorStore, stop_event: asyncio.Event
+) -> None:
+    """Tâche de fond: écrit périodiquement les couleurs en attente."""
+    from app.utils.executor import run_blocking
+
+    while True:
+        stopping = False
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=store.flush_interval)
+            stopping = True
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            stopping = True
+        try:
+            await run_blocking(store.flush)
+        except Exception:
+            logging.exception("track_color_flusher: exception inattendue")
+        if stopping:
+            break
+
+
+_STORE: Optional[TrackColorStore] = None
+
+
+def get_track_color_store() -> TrackColorStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = TrackColorStore()
+    return _STORE
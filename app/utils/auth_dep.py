@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from .security import decode_token
 from .database import get_db
 from ..models.user import User, UserBan
+from ..services.bans import get_ban_index
 from datetime import datetime
 
 
@@ -41,7 +42,10 @@ def get_current_user(
     u = db.query(User).filter(User.id == sub).first()
     if not u:
         raise HTTPException(status_code=401, detail="Invalid token")
-    # Bloquer si banni (ban actif: until NULL ou > now, et non révoqué)
+    # Bloquer si banni: l'index en mémoire évite la requête dans le cas courant,
+    # la DB confirme uniquement quand l'index signale un ban
+    if not get_ban_index().is_banned(u.id):
+        return u
     now = datetime.utcnow()
     active_ban = (
         db.query(UserBan)
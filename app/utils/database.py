@@ -127,6 +127,19 @@ def create_all(BaseCls: type[DeclarativeBase] | None = None):
                     conn.commit()
                 except Exception:
                     pass
+            # Empreinte indexée du refresh token (lookup sans déchiffrement)
+            try:
+                conn.execute(
+                    text(
+                        """
+                ALTER TABLE api_user_sessions
+                ADD COLUMN IF NOT EXISTS refresh_token_fp VARCHAR(64) NULL
+                """
+                    )
+                )
+                conn.commit()
+            except Exception:
+                pass
             # Créer la table api_spotify_tokens si absente
             try:
                 conn.execute(
@@ -360,6 +373,12 @@ def create_all(BaseCls: type[DeclarativeBase] | None = None):
                         conn.execute(text(ddl))
                         conn.commit()
 
+                ensure_col_generic(
+                    "api_user_sessions",
+                    "refresh_token_fp",
+                    "ALTER TABLE api_user_sessions ADD COLUMN refresh_token_fp VARCHAR(64) NULL",
+                )
+
                 # Migration fallback: si refresh_token_enc existe, copier vers refresh_token
                 try:
                     res = conn.execute(
@@ -501,3 +520,77 @@ def create_all(BaseCls: type[DeclarativeBase] | None = None):
         except Exception:
             # Laisser passer: l'app fonctionnera mais la colonne devra être ajoutée manuellement
             pass
+    # Index unique + rétro-remplissage des empreintes de refresh token
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text(
+                    """
+                CREATE UNIQUE INDEX ix_api_user_sessions_refresh_token_fp
+                ON api_user_sessions (refresh_token_fp)
+                """
+                )
+            )
+            conn.commit()
+    except Exception:
+        # Index déjà présent (créé par metadata.create_all ou un démarrage précédent)
+        pass
+    try:
+        backfill_refresh_token_fingerprints()
+    except Exception:
+        pass
+
+
+def backfill_refresh_token_fingerprints(batch_size: int = 500) -> int:
+    """Renseigne refresh_token_fp des sessions existantes (déchiffrement unique).
+
+    Idempotent: ne traite que les lignes sans empreinte. Retourne le nombre de lignes mises à jour.
+    """
+    import app.utils.encryption as enc
+    from .security import refresh_token_fingerprint
+
+    updated = 0
+    last_id = ""
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(
+                text(
+                    """
+                SELECT id, refresh_token FROM api_user_sessions
+                WHERE refresh_token_fp IS NULL AND id > :last_id
+                ORDER BY id
+                LIMIT :batch_size
+                """
+                ),
+                {"last_id": last_id, "batch_size": batch_size},
+            ).all()
+            if not rows:
+                break
+            for session_id, stored in rows:
+                last_id = session_id
+                plain = enc.decrypt_str(stored) if stored else None
+                if not plain:
+                    continue
+                fp = refresh_token_fingerprint(plain)
+                # Doublon (anciens tokens émis dans la même seconde): laisser la
+                # ligne au lookup de compat plutôt que d'échouer sur l'index unique
+                taken = conn.execute(
+                    text("SELECT 1 FROM api_user_sessions WHERE refresh_token_fp = :fp"),
+                    {"fp": fp},
+                ).first()
+                if taken:
+                    continue
+                try:
+                    # Savepoint par ligne: un échec n'annule pas le reste du lot
+                    with conn.begin_nested():
+                        conn.execute(
+                            text(
+                                "UPDATE api_user_sessions SET refresh_token_fp = :fp WHERE id = :id"
+                            ),
+                            {"fp": fp, "id": session_id},
+                        )
+                    updated += 1
+                except Exception:
+                    continue
+            conn.commit()
+    return updated
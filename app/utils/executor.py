@@ -0,0 +1,65 @@
+import os
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Pool dédié (borné) aux opérations bloquantes appelées depuis des routes async:
+# requêtes SQLAlchemy synchrones, déchiffrement, traitement d'images...
+# Séparé du threadpool Starlette pour ne pas concurrencer les routes sync.
+BLOCKING_POOL_SIZE = max(1, int(os.getenv("BLOCKING_POOL_SIZE", "8")))
+
+# Pool de processus optionnel pour l'analyse des pochettes (CPU pur, tient le GIL).
+# 0 = désactivé: l'analyse reste dans le thread appelant.
+COLOR_EXTRACTION_PROCESSES = max(0, int(os.getenv("COLOR_EXTRACTION_PROCESSES", "0")))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking-io"
+        )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Exécute fn dans le pool dédié sans bloquer la boucle d'événements."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_blocking_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+def shutdown_blocking_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_color_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de processus d'extraction de couleurs, ou None si désactivé."""
+    global _process_pool
+    if COLOR_EXTRACTION_PROCESSES <= 0:
+        return None
+    if _process_pool is None:
+        # spawn: pas de fork d'un processus qui a déjà des threads et des sockets
+        _process_pool = ProcessPoolExecutor(
+            max_workers=COLOR_EXTRACTION_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_color_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -1,7 +1,13 @@
 import os
 import time
+import asyncio
+import hmac
 import hashlib
+import uuid
+import threading
 import pyotp
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple
 from jose import jwt, JWTError
 from argon2 import PasswordHasher, exceptions as argon_exc
@@ -10,15 +16,91 @@ JWT_SECRET = os.getenv("JWT_SECRET", os.getenv("SECRET_KEY", "change-me"))
 JWT_ALG = os.getenv("JWT_ALG", "HS256")
 ACCESS_TOKEN_EXPIRE_MIN = int(os.getenv("ACCESS_TOKEN_EXPIRE_MIN", "15"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Cache LRU des payloads JWT vérifiés (0 = désactivé)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
 
-password_hasher = PasswordHasher()
+# Paramètres Argon2 surchargeables; les hashes existants sont mis à niveau au login
+_ARGON2_PARAMS = {
+    k: int(v)
+    for k, v in {
+        "time_cost": os.getenv("ARGON2_TIME_COST"),
+        "memory_cost": os.getenv("ARGON2_MEMORY_COST"),
+        "parallelism": os.getenv("ARGON2_PARALLELISM"),
+    }.items()
+    if v
+}
+password_hasher = PasswordHasher(**_ARGON2_PARAMS)
 
 
-def hash_password(password: str) -> str:
-    return password_hasher.hash(password)
+class PasswordHasherBusy(RuntimeError):
+    """File d'attente Argon2 pleine: la requête doit échouer vite (503)."""
 
 
-def verify_password(password: str, password_hash: str) -> bool:
+class _PasswordHashPool:
+    """Pool borné dédié à Argon2 (CPU + mémoire), séparé du threadpool Starlette.
+
+    Au-delà de `queue_limit` opérations en cours/en attente, on refuse
+    immédiatement plutôt que d'accumuler threads et mémoire.
+    """
+
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.workers = max(1, workers)
+        self.queue_limit = max(self.workers, queue_limit)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="argon2"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats_counters = {"completed": 0, "rejected": 0, "max_pending": 0}
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                self.stats_counters["rejected"] += 1
+                raise PasswordHasherBusy("password_hasher_busy")
+            self._pending += 1
+            if self._pending > self.stats_counters["max_pending"]:
+                self.stats_counters["max_pending"] = self._pending
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.stats_counters["completed"] += 1
+
+    async def run(self, fn, *args):
+        """Attente sans thread: les routes async ne bloquent pas le threadpool."""
+        self._reserve()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": pending,
+            "utilization": round(min(pending, self.workers) / self.workers, 3),
+            **self.stats_counters,
+        }
+
+
+_password_pool = _PasswordHashPool(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    queue_limit=int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32")),
+)
+
+
+def password_pool_stats() -> dict:
+    return _password_pool.stats()
+
+
+def _verify(password_hash: str, password: str) -> bool:
     try:
         return password_hasher.verify(password_hash, password)
     except argon_exc.VerifyMismatchError:
@@ -27,6 +109,23 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+async def hash_password_async(password: str) -> str:
+    return await _password_pool.run(password_hasher.hash, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """Vérifie le mot de passe; lève PasswordHasherBusy si le pool est saturé."""
+    return await _password_pool.run(_verify, password_hash, password)
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """True si le hash a été produit avec d'autres paramètres Argon2 (coût nul)."""
+    try:
+        return password_hasher.check_needs_rehash(password_hash)
+    except Exception:
+        return False
+
+
 def create_access_token(sub: str, extra: Optional[dict] = None) -> str:
     now = int(time.time())
     payload = {
@@ -47,14 +146,84 @@ def create_refresh_token(sub: str, extra: Optional[dict] = None) -> str:
         "iat": now,
         "exp": now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
         "type": "refresh",
+        # Aléa: deux tokens émis dans la même seconde restent distincts
+        # (l'empreinte refresh_token_fp est unique en base)
+        "jti": uuid.uuid4().hex,
     }
     if extra:
         payload.update(extra)
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
 
+class _VerifiedTokenCache:
+    """LRU borné: empreinte SHA-256 du token -> (payload vérifié, exp).
+
+    Une entrée n'est servie que jusqu'à l'expiration du token; les tokens
+    invalides ne sont jamais mis en cache.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes, now: float) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, exp = entry
+            if now >= exp:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: bytes, payload: dict, exp: float) -> None:
+        with self._lock:
+            self._entries[key] = (payload, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "max_entries": self.max_entries,
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_token_cache = _VerifiedTokenCache(JWT_CACHE_SIZE)
+
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
+
+
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    if _token_cache.max_entries <= 0:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _token_cache.get(key, time.time())
+    if cached is not None:
+        # Copie: les appelants ne doivent pas altérer l'entrée partagée
+        return dict(cached)
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache.put(key, dict(payload), float(exp))
+    return payload
 
 
 def decode_token_noexp(token: str) -> dict:
@@ -69,6 +238,15 @@ def decode_token_noexp(token: str) -> dict:
     )
 
 
+def refresh_token_fingerprint(token: str) -> str:
+    """Empreinte HMAC-SHA256 (clé serveur) d'un refresh token.
+    Stockée en clair et indexée pour retrouver une session sans tout déchiffrer.
+    """
+    return hmac.new(
+        JWT_SECRET.encode("utf-8"), token.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+
 def is_refresh(token_payload: dict) -> bool:
     return token_payload.get("type") == "refresh"
 
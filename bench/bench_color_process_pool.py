@@ -0,0 +1,71 @@
+"""Débit d'extraction de N pochettes concurrentes selon COLOR_EXTRACTION_PROCESSES.
+
+0 processus = analyse dans des threads (GIL partagé); sinon pool de
+processus spawn comme en production (octets JPEG in, tuple RGB out).
+
+Usage: python bench/bench_color_process_pool.py [--covers 64] [--processes 0,1,2,4] [--engine numpy]
+"""
+
+import os
+import io
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import app.utils.executor as executor  # noqa: E402
+from app.services.color_extractor_service import extract_color_from_bytes  # noqa: E402
+
+
+def _covers(count: int):
+    rng = np.random.default_rng(0)
+    covers = []
+    for _ in range(count):
+        buf = io.BytesIO()
+        small = Image.fromarray(rng.integers(0, 255, (8, 8, 3), dtype=np.uint8))
+        small.resize((300, 300)).save(buf, "JPEG")
+        covers.append(buf.getvalue())
+    return covers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--covers", type=int, default=64)
+    parser.add_argument("--processes", default="0,1,2,4")
+    parser.add_argument("--engine", default="numpy", choices=["numpy", "python"])
+    args = parser.parse_args()
+
+    covers = _covers(args.covers)
+    print(f"{os.cpu_count()} cœur(s), {len(covers)} pochettes, moteur {args.engine}")
+    for processes in (int(p) for p in args.processes.split(",")):
+        executor.COLOR_EXTRACTION_PROCESSES = processes
+        executor.shutdown_color_process_pool()
+        pool = executor.get_color_process_pool()
+        if pool is not None:
+            # Démarrage des processus hors mesure
+            list(pool.map(extract_color_from_bytes, covers[:processes], [args.engine] * processes))
+
+            def run(data):
+                return pool.submit(extract_color_from_bytes, data, args.engine).result()
+
+        else:
+
+            def run(data):
+                return extract_color_from_bytes(data, args.engine)
+
+        started = time.perf_counter()
+        # Comme le serveur: des appels concurrents (pool bloquant de 16 threads)
+        with ThreadPoolExecutor(16) as threads:
+            list(threads.map(run, covers))
+        elapsed = time.perf_counter() - started
+        print(f"processus={processes}: {len(covers) / elapsed:.0f} pochettes/s")
+    executor.shutdown_color_process_pool()
+
+
+if __name__ == "__main__":
+    main()
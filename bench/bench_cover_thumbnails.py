@@ -0,0 +1,92 @@
+"""Pochette 640 décodée en entier vs vignette 300 décodée en draft: octets, temps, couleur.
+
+Compare le chemin par défaut (JPEG 640x640, décodage complet, LANCZOS -> 100x100)
+au chemin rapide COLOR_FAST_THUMBNAILS (JPEG ~300x300 via pick_analysis_image,
+draft + bilinéaire) sur des pochettes synthétiques, et mesure l'écart de
+couleur extraite. À relancer sur de vraies pochettes avant d'activer le flag.
+
+Usage: python bench/bench_cover_thumbnails.py [--covers 200]
+"""
+
+import os
+import io
+import sys
+import argparse
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from PIL import Image, ImageFilter  # noqa: E402
+
+from app.services.color_extractor_service import ColorExtractor, decode_thumbnail  # noqa: E402
+
+
+def _jpeg(image: Image.Image, size: int) -> bytes:
+    buf = io.BytesIO()
+    image.resize((size, size), Image.Resampling.LANCZOS).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _covers(count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        # Aplats flous: proche d'une pochette réelle, pas du bruit pur
+        base = Image.fromarray(rng.integers(0, 255, (16, 16, 3), dtype=np.uint8))
+        base = base.resize((640, 640), Image.Resampling.BICUBIC)
+        yield base.filter(ImageFilter.GaussianBlur(8))
+
+
+def _gap(a, b) -> int:
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def _describe(label: str, values) -> None:
+    d = np.array(values)
+    print(
+        f"  {label:<28} identique={np.mean(d == 0):.1%}  <=8={np.mean(d <= 8):.1%}"
+        f"  <=24={np.mean(d <= 24):.1%}  médiane={np.median(d):.0f}"
+        f"  p95={np.percentile(d, 95):.0f}  max={d.max()}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--covers", type=int, default=200)
+    args = parser.parse_args()
+
+    extractor = ColorExtractor()
+    old_bytes = new_bytes = 0
+    old_time = new_time = 0.0
+    diffs = []
+    # Décomposition de l'écart: source 300 seule, resample draft+bilinéaire seul
+    source_only, resample_only = [], []
+    for cover in _covers(args.covers):
+        full, small = _jpeg(cover, 640), _jpeg(cover, 300)
+        old_bytes += len(full)
+        new_bytes += len(small)
+
+        started = time.perf_counter()
+        old_color = extractor.extract_primary_color(decode_thumbnail(full, fast=False))
+        old_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        new_color = extractor.extract_primary_color(decode_thumbnail(small, fast=True))
+        new_time += time.perf_counter() - started
+
+        diffs.append(_gap(old_color, new_color))
+        source_only.append(
+            _gap(old_color, extractor.extract_primary_color(decode_thumbnail(small, fast=False)))
+        )
+        resample_only.append(_gap(old_color, extractor.extract_primary_color(decode_thumbnail(full, fast=True))))
+
+    n = args.covers
+    print(f"octets/pochette: 640={old_bytes / n / 1024:.1f} KiB  300={new_bytes / n / 1024:.1f} KiB")
+    print(f"décodage+extraction: 640={old_time / n * 1000:.2f} ms  vignette={new_time / n * 1000:.2f} ms")
+    print("écart de couleur vs 640 LANCZOS (max par canal, 0-255):")
+    _describe("chemin rapide (300 draft)", diffs)
+    _describe("source 300 seule (LANCZOS)", source_only)
+    _describe("draft+bilinéaire seul (640)", resample_only)
+
+if __name__ == "__main__":
+    main()
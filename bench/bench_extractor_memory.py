@@ -0,0 +1,82 @@
+"""Empreinte mémoire des pochettes pour 1 000 utilisateurs simulés.
+
+Chaque utilisateur télécharge `--tracks` pochettes parmi `--catalog` URL
+distinctes (CDN simulé, aucun réseau). On mesure avec tracemalloc ce que
+retient le processus: vignettes 100x100 du cache global borné en octets.
+
+Usage: python bench/bench_extractor_memory.py [--users 1000] [--tracks 10] [--catalog 300]
+"""
+
+import os
+import io
+import sys
+import asyncio
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import app.services.http_client as http_client  # noqa: E402
+from app.services.color_cache import get_thumbnail_cache  # noqa: E402
+from app.services.color_extractor_service import ColorExtractor  # noqa: E402
+
+
+def _cover_bank(count: int = 30):
+    rng = np.random.default_rng(0)
+    bank = []
+    for _ in range(count):
+        buf = io.BytesIO()
+        small = Image.fromarray(rng.integers(0, 255, (8, 8, 3), dtype=np.uint8))
+        small.resize((300, 300)).save(buf, "JPEG")
+        bank.append(buf.getvalue())
+    return bank
+
+
+async def _simulate(users: int, tracks: int, catalog: int, bank) -> list:
+    def handler(request: httpx.Request) -> httpx.Response:
+        cover_id = int(request.url.path.rsplit("/", 1)[-1])
+        return httpx.Response(200, content=bank[cover_id % len(bank)])
+
+    http_client._build_client = lambda pool: httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    extractors = []
+    for user in range(users):
+        extractor = ColorExtractor()
+        extractors.append(extractor)
+        for k in range(tracks):
+            url = f"https://i.scdn.co/image/{(user * 7 + k) % catalog}"
+            await extractor.download_image(url)
+    await http_client.close_http_clients()
+    return extractors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tracks", type=int, default=10)
+    parser.add_argument("--catalog", type=int, default=300)
+    args = parser.parse_args()
+
+    bank = _cover_bank()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    extractors = asyncio.run(_simulate(args.users, args.tracks, args.catalog, bank))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = current - baseline
+    print(f"{len(extractors)} utilisateurs x {args.tracks} pochettes ({args.catalog} distinctes)")
+    print(f"mémoire retenue: {retained / 1e6:.1f} MB ({retained / len(extractors) / 1024:.1f} KiB/utilisateur), pic {peak / 1e6:.1f} MB")
+    print(f"cache de vignettes: {get_thumbnail_cache().get_stats()}")
+    # Ancien cache: 10 images PIL pleine résolution par extracteur
+    old = args.tracks * 640 * 640 * 3
+    print(f"ancien image_cache (estimation): {old / 1e6:.1f} MB/utilisateur, {old * args.users / 1e9:.1f} GB au total")
+
+
+if __name__ == "__main__":
+    main()
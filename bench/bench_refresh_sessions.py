@@ -0,0 +1,78 @@
+"""Latence du refresh selon le nombre de sessions (empreinte indexée vs déchiffrement).
+
+Usage: python bench/bench_refresh_sessions.py [--repeat 20]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+)
+# Chiffrement Fernet réel: le chemin historique déchiffre chaque session
+os.environ.setdefault("ENCRYPTION_KEY", "bench-encryption-key")
+
+import app.utils.encryption as enc  # noqa: E402
+from app.models.user import User, UserSession  # noqa: E402
+from app.utils.database import SessionLocal, create_all  # noqa: E402
+from app.utils.security import create_refresh_token, refresh_token_fingerprint  # noqa: E402
+from app.controllers.auth_controller import AuthController  # noqa: E402
+
+
+def _seed(db, user: User, count: int, with_fingerprint: bool) -> str:
+    db.query(UserSession).delete()
+    token = ""
+    for _ in range(count):
+        token = create_refresh_token(user.id)
+        db.add(
+            UserSession(
+                user_id=user.id,
+                refresh_token=enc.encrypt_str(token),
+                refresh_token_fp=refresh_token_fingerprint(token) if with_fingerprint else None,
+                created_at=datetime.utcnow(),
+                expires_at=datetime.utcnow() + timedelta(days=30),
+            )
+        )
+    db.commit()
+    # Le plus récent: pire cas du balayage historique
+    return token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_all(None)
+    db = SessionLocal()
+    ctrl = AuthController()
+    user = User(username="bench", email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+
+    print(f"{'sessions':>8} {'empreinte (ms)':>15} {'déchiffrement (ms)':>19} {'refresh complet (ms)':>21}")
+    for count in (1, 100, 1000):
+        timings = {}
+        for label, with_fp in (("fp", True), ("legacy", False)):
+            token = _seed(db, user, count, with_fp)
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                assert ctrl._find_session(db, user.id, token) is not None
+            timings[label] = (time.perf_counter() - started) / args.repeat * 1000
+        token = _seed(db, user, count, True)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            # Rotation: chaque refresh renvoie le token suivant
+            _, token = ctrl.refresh(db, token)
+        timings["refresh"] = (time.perf_counter() - started) / args.repeat * 1000
+        print(f"{count:>8} {timings['fp']:>15.2f} {timings['legacy']:>19.2f} {timings['refresh']:>21.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
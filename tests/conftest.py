@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Les modules de l'app lisent DATABASE_URL à l'import: base SQLite jetable
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db")
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,112 @@
+"""Single-flight d'AlbumColorCache.get_or_compute: un seul calcul par URL."""
+
+import asyncio
+
+import pytest
+
+from app.services.color_cache import AlbumColorCache
+
+URL = "https://i.scdn.co/image/cover"
+
+
+def _counting_compute(result=(10, 20, 30), delay=0.05, error=None):
+    calls = {"n": 0}
+
+    async def compute():
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    return compute, calls
+
+
+def test_concurrent_calls_share_one_download():
+    cache = AlbumColorCache(max_entries=10)
+    compute, calls = _counting_compute()
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get_or_compute(URL, compute) for _ in range(20))
+        )
+
+    results = asyncio.run(scenario())
+    assert results == [(10, 20, 30)] * 20
+    assert calls["n"] == 1
+    assert cache.stats["computations"] == 1
+    assert cache.stats["coalesced"] == 19
+    # Résultat mis en cache: plus aucun calcul
+    assert asyncio.run(cache.get_or_compute(URL, compute)) == (10, 20, 30)
+    assert calls["n"] == 1
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    cache = AlbumColorCache(max_entries=10)
+    compute, calls = _counting_compute(error=RuntimeError("cdn down"))
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get_or_compute(URL, compute) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert calls["n"] == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "cdn down" for r in results)
+    assert cache.get(URL) is None
+
+
+def test_waiter_timeout_does_not_cancel_the_leader():
+    cache = AlbumColorCache(max_entries=10)
+    compute, calls = _counting_compute(delay=0.3)
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute(URL, compute))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await cache.get_or_compute(URL, compute, timeout=0.05)
+        return await leader
+
+    assert asyncio.run(scenario()) == (10, 20, 30)
+    assert calls["n"] == 1
+    assert cache.stats["wait_timeouts"] == 1
+
+
+def test_leader_cancellation_hands_over_to_a_waiter():
+    cache = AlbumColorCache(max_entries=10)
+    compute, calls = _counting_compute(delay=0.1)
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute(URL, compute))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(cache.get_or_compute(URL, compute)) for _ in range(3)
+        ]
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    # Les suiveurs, jamais annulés, reçoivent la couleur d'un nouveau calcul
+    assert asyncio.run(scenario()) == [(10, 20, 30)] * 3
+    assert calls["n"] == 2
+
+
+def test_cancelled_waiter_still_raises_cancelled():
+    cache = AlbumColorCache(max_entries=10)
+    compute, calls = _counting_compute(delay=0.1)
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute(URL, compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute(URL, compute))
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(scenario()) == (10, 20, 30)
+    assert calls["n"] == 1
@@ -0,0 +1,49 @@
+"""Parité des moteurs d'extraction: numpy doit rendre exactement la couleur du moteur Python."""
+
+import random
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("numpy")
+
+from app.services.color_extractor_service import ColorExtractor  # noqa: E402
+
+
+def _generated_images(count: int, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(count):
+        kind = i % 6
+        w = rnd.choice([16, 64, 100, 300])
+        if kind == 0:  # uni
+            yield Image.new("RGB", (w, w), tuple(rnd.randrange(256) for _ in range(3)))
+        elif kind == 1:  # bruit
+            yield Image.frombytes("RGB", (w, w), rnd.randbytes(w * w * 3))
+        elif kind == 2:  # très sombre
+            data = bytes(rnd.randrange(40) for _ in range(w * w * 3))
+            yield Image.frombytes("RGB", (w, w), data)
+        elif kind == 3:  # niveaux de gris
+            yield Image.frombytes("L", (w, w), rnd.randbytes(w * w)).convert("RGB")
+        elif kind == 4:  # aplats de couleurs
+            im = Image.new("RGB", (w, w))
+            for _ in range(8):
+                x, y = rnd.randrange(w), rnd.randrange(w)
+                box = (x, y, min(w, x + rnd.randrange(1, w)), min(w, y + rnd.randrange(1, w)))
+                im.paste(tuple(rnd.randrange(256) for _ in range(3)), box)
+            yield im
+        else:  # dégradés
+            grad = Image.linear_gradient("L").resize((w, w))
+            flat = Image.new("L", (w, w), rnd.randrange(256))
+            yield Image.merge("RGB", [grad, grad.rotate(90), flat])
+
+
+def test_numpy_engine_matches_python_engine():
+    python_engine = ColorExtractor(engine="python")
+    numpy_engine = ColorExtractor(engine="numpy")
+    mismatches = []
+    for i, im in enumerate(_generated_images(300)):
+        expected = python_engine.extract_primary_color(im)
+        actual = numpy_engine.extract_primary_color(im)
+        if actual != expected:
+            mismatches.append((i, expected, actual))
+    assert mismatches == []
@@ -0,0 +1,45 @@
+"""Le hash Argon2 est mis à niveau dès que le mot de passe est vérifié."""
+
+import asyncio
+import uuid
+
+import pytest
+from argon2 import PasswordHasher
+
+from app.controllers.auth_controller import AuthController
+from app.models.user import User, UserBan
+from app.services.bans import get_ban_index
+from app.utils.database import SessionLocal, create_all
+from app.utils.security import password_needs_rehash
+
+PASSWORD = "correct horse battery"
+
+
+def test_legacy_hash_is_upgraded_even_when_login_is_refused():
+    create_all()
+    legacy = PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1)
+    db = SessionLocal()
+    try:
+        user = User(
+            username="legacy",
+            email=f"{uuid.uuid4().hex}@example.com",
+            password_hash=legacy.hash(PASSWORD),
+        )
+        db.add(user)
+        db.flush()
+        db.add(UserBan(user_id=user.id, moderator_id=user.id, reason="test"))
+        db.commit()
+        get_ban_index().refresh_user(db, user.id)
+        assert password_needs_rehash(user.password_hash)
+
+        with pytest.raises(ValueError, match="user_banned"):
+            asyncio.run(AuthController().login_step1(db, user.email, PASSWORD))
+    finally:
+        db.close()
+
+    db = SessionLocal()
+    try:
+        stored = db.query(User).filter(User.id == user.id).one()
+        assert not password_needs_rehash(stored.password_hash)
+    finally:
+        db.close()
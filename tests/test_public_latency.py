@@ -0,0 +1,57 @@
+"""Un extracteur lent (Spotify/DB) ne doit pas geler la boucle d'événements."""
+
+import asyncio
+import time
+
+import httpx
+
+from app.main import app
+from app.services.state import get_state
+
+SLOW_SECONDS = 1.0
+
+
+class _IdleExtractor:
+    def get_snapshot(self):
+        return None
+
+    def snapshot_color(self, snapshot):
+        return (0, 0, 0)
+
+
+def test_health_stays_fast_while_color_waits_on_slow_spotify(monkeypatch):
+    state = get_state()
+
+    def slow_get_extractor_for_known_user(user_id, db):
+        # Simule le rafraîchissement de token Spotify / la DB lente
+        time.sleep(SLOW_SECONDS)
+        return _IdleExtractor()
+
+    monkeypatch.setattr(state, "get_cached_extractor", lambda user_id: None)
+    monkeypatch.setattr(
+        state, "get_extractor_for_known_user", slow_get_extractor_for_known_user
+    )
+
+    async def probe(client, due):
+        # Latence mesurée depuis l'instant prévu: une boucle gelée la compte
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        response = await client.get("/health")
+        assert response.status_code == 200
+        return time.perf_counter() - due
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            colors = [
+                asyncio.create_task(client.get(f"/color/user{i}")) for i in range(4)
+            ]
+            start = time.perf_counter()
+            latencies = await asyncio.gather(
+                *(probe(client, start + 0.05 + 0.1 * i) for i in range(5))
+            )
+            results = await asyncio.gather(*colors)
+        return latencies, results
+
+    latencies, results = asyncio.run(scenario())
+    assert [r.status_code for r in results] == [200] * 4
+    assert max(latencies) < SLOW_SECONDS / 4
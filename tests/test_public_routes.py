@@ -0,0 +1,56 @@
+"""Routes publiques /color et /infos."""
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.state import get_state
+from app.utils.database import create_all
+
+
+def test_unknown_user_gets_404_without_registering_an_extractor():
+    create_all()
+    state = get_state()
+    client = TestClient(app)
+    before = set(state.user_extractors)
+    for route in ("color", "infos"):
+        response = client.get(f"/{route}/{uuid.uuid4().hex[:22]}")
+        assert response.status_code == 404
+    assert set(state.user_extractors) == before
+
+
+class _Snapshot:
+    def __init__(self, n: int) -> None:
+        self.fetched_at = 1_700_000_000 + n
+        self.track = {"id": f"t{n}", "name": f"Track {n}", "progress_ms": n}
+        self.color = (n, n, n)
+
+    def age_ms(self) -> int:
+        return 0
+
+
+class _AdvancingExtractor:
+    """Chaque lecture renvoie un snapshot plus récent (poller concurrent)."""
+
+    def __init__(self) -> None:
+        self.reads = 0
+
+    def get_snapshot(self):
+        self.reads += 1
+        return _Snapshot(self.reads)
+
+    def snapshot_color(self, snapshot):
+        return snapshot.color
+
+
+def test_infos_builds_the_payload_from_a_single_snapshot(monkeypatch):
+    state = get_state()
+    extractor = _AdvancingExtractor()
+    monkeypatch.setattr(state, "get_cached_extractor", lambda user_id: extractor)
+    body = TestClient(app).get("/infos/someone").json()
+    assert extractor.reads == 1
+    n = body["track"]["progress_ms"]
+    assert body["track"]["id"] == f"t{n}"
+    assert body["fetched_at"] == 1_700_000_000 + n
+    assert body["color"]["r"] == n
@@ -0,0 +1,125 @@
+"""RedisBroker derrière un faux pub/sub: un kick atteint les sockets des autres workers."""
+
+import asyncio
+
+from app.services.realtime import ConnectionManager
+from app.services.realtime_broker import RedisBroker
+
+
+class _FakeRedis:
+    """Sous-ensemble de redis.asyncio partagé par tous les « workers »."""
+
+    def __init__(self) -> None:
+        self.subscribers = []
+
+    async def publish(self, channel, payload):
+        for pubsub in list(self.subscribers):
+            if channel in pubsub.channels:
+                pubsub.queue.put_nowait(
+                    {"type": "message", "channel": channel, "data": payload.encode()}
+                )
+        return len(self.subscribers)
+
+    def pubsub(self):
+        return _FakePubSub(self)
+
+
+class _FakePubSub:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self.redis = redis
+        self.channels = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+        self.redis.subscribers.append(self)
+        self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, channel):
+        self.channels.discard(channel)
+        if self in self.redis.subscribers:
+            self.redis.subscribers.remove(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        return None
+
+
+class _FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent = []
+        self.closed = None
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = (code, reason)
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timeout"
+        await asyncio.sleep(0.01)
+
+
+def test_kick_user_reaches_sockets_held_by_another_worker(monkeypatch):
+    monkeypatch.setenv("WS_PING_INTERVAL_SECONDS", "0")
+
+    async def scenario():
+        redis = _FakeRedis()
+        worker_a = ConnectionManager(broker=RedisBroker(client=redis, channel="test"))
+        worker_b = ConnectionManager(broker=RedisBroker(client=redis, channel="test"))
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            await _until(lambda: len(redis.subscribers) == 2)
+            on_b = _FakeWebSocket()
+            other_user = _FakeWebSocket()
+            await worker_b.connect("u1", on_b)
+            await worker_b.connect("u2", other_user)
+
+            # Émis par le worker A, qui ne détient aucune socket de u1
+            await worker_a.kick_user("u1", reason="banned")
+
+            await _until(lambda: on_b.closed is not None)
+            assert on_b.sent == [{"type": "force_logout", "reason": "banned"}]
+            assert on_b.closed == (4401, "banned")
+            assert other_user.sent == [] and other_user.closed is None
+            assert worker_a.broker.get_stats()["published"] == 2
+            assert worker_b.broker.get_stats()["received"] == 2
+        finally:
+            await worker_a.stop()
+            await worker_b.stop()
+
+    asyncio.run(scenario())
+
+
+def test_close_user_crosses_workers(monkeypatch):
+    monkeypatch.setenv("WS_PING_INTERVAL_SECONDS", "0")
+
+    async def scenario():
+        redis = _FakeRedis()
+        worker_a = ConnectionManager(broker=RedisBroker(client=redis, channel="test"))
+        worker_b = ConnectionManager(broker=RedisBroker(client=redis, channel="test"))
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            await _until(lambda: len(redis.subscribers) == 2)
+            on_a, on_b = _FakeWebSocket(), _FakeWebSocket()
+            await worker_a.connect("u1", on_a)
+            await worker_b.connect("u1", on_b)
+
+            await worker_b.close_user("u1", code=4403, reason="disabled")
+
+            await _until(lambda: on_a.closed is not None and on_b.closed is not None)
+            assert on_a.closed == on_b.closed == (4403, "disabled")
+        finally:
+            await worker_a.stop()
+            await worker_b.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+"""Mémo 1 s de get_current_track: le drapeau throttled suit le résultat mémorisé."""
+
+import asyncio
+import time
+
+import httpx
+
+import app.services.spotify_client_service as svc
+
+
+class _Limiter:
+    def __init__(self) -> None:
+        self.allow = False
+
+    def try_acquire(self, client_id) -> bool:
+        return self.allow
+
+
+def _client(monkeypatch, limiter: _Limiter) -> svc.SpotifyClient:
+    def handler(request):
+        return httpx.Response(204)
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(svc, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(svc, "get_http_client", lambda pool=None: http)
+    client = svc.SpotifyClient()
+    client.spotify_enabled = True
+    client.spotify_client_id = "cid"
+    client.spotify_refresh_token = "refresh"
+    client.spotify_access_token = "access"
+    client.spotify_token_expires = time.time() + 3600
+    return client
+
+
+def test_memoized_result_reports_its_own_throttle_state(monkeypatch):
+    limiter = _Limiter()
+    client = _client(monkeypatch, limiter)
+
+    async def scenario():
+        # 1) Limiteur fermé: dernier état connu, throttled
+        await client.get_current_track()
+        assert client.throttled
+        client.throttled = False
+        await client.get_current_track()
+        assert client.throttled
+
+        # 2) Appel réel réussi après la fenêtre du mémo: plus de throttling
+        limiter.allow = True
+        client._last_spotify_check -= 1
+        result = await client.get_current_track()
+        assert result["name"] == "No music playing"
+        assert not client.throttled
+        client.throttled = True
+        assert await client.get_current_track() is result
+        assert not client.throttled
+
+    asyncio.run(scenario())
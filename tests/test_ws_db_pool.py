@@ -0,0 +1,47 @@
+"""Les spectateurs WebSocket ne gardent pas de connexion du pool DB."""
+
+import time
+import uuid
+from contextlib import ExitStack
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.user import Overlay, User
+from app.utils.database import SessionLocal, create_all, engine
+
+# Au-delà du pool par défaut (5 + 10 en débordement)
+VIEWERS = 20
+
+
+def _make_overlay() -> str:
+    create_all()
+    db = SessionLocal()
+    try:
+        user = User(
+            username="viewer-owner",
+            email=f"{uuid.uuid4().hex}@example.com",
+            password_hash="x",
+        )
+        db.add(user)
+        db.flush()
+        overlay = Overlay(owner_id=user.id)
+        db.add(overlay)
+        db.commit()
+        return overlay.id
+    finally:
+        db.close()
+
+
+def test_overlay_viewers_do_not_exhaust_db_pool():
+    overlay_id = _make_overlay()
+    client = TestClient(app)
+    with ExitStack() as stack:
+        for _ in range(VIEWERS):
+            ws = stack.enter_context(client.websocket_connect(f"/ws/overlay/{overlay_id}"))
+            assert ws.receive_json()["type"] == "track_update"
+        assert engine.pool.checkedout() == 0
+        started = time.perf_counter()
+        response = client.get(f"/overlay/{overlay_id}")
+        assert response.status_code == 200
+        assert time.perf_counter() - started < 5